@@ -2,19 +2,7 @@
 
 import os
 
-import numpy as np
-
-import labrad
-from labrad import types as T, util
-from labrad.units import ns, us
-
-
-#from plotly import graph_objects as go
-
 from constants import QSConstants
-from server import QuBE_Server
-#from manager import QuBE_Manager_Server
-from helper import QuBE_Server_debug_otasuke
 
 ############################################################
 #
@@ -24,6 +12,12 @@ from helper import QuBE_Server_debug_otasuke
 #  > QubeServer.usage()
 #
 def usage():
+    import numpy as np
+
+    import labrad
+    from labrad import types as T
+    from labrad.units import ns, us
+
     cxn = labrad.connect()
     qs = cxn.qube_server
 
@@ -186,30 +180,32 @@ def usage():
 #
 # Otherwise, QuBE Server starts in debugging mode.
 #
+# Only the module of the selected server is imported, so that the other servers
+# and their device libraries do not slow down the start.
+#
+def create_server(server_select=None):
+    if server_select is None:
+        server_select = os.environ.get(QSConstants.ENV_SRVSEL)
+    if QSConstants.MNRNAME == server_select:
+        from manager import QuBE_Manager_Server
 
-try:
-    server_select = os.environ[QSConstants.ENV_SRVSEL]
-    # if server_select == QSConstants.MNRNAME:
-    #     __server__ = QuBE_Manager_Server()
-    if server_select == QSConstants.SRVNAME:
-        __server__ = QuBE_Server()
+        return QuBE_Manager_Server()
+    elif QSConstants.SRVNAME == server_select:
+        from server import QuBE_Server
+
+        return QuBE_Server()
     else:
-        server_select = None
-except KeyError as e:
-    server_select = None
+        from helper import QuBE_Server_debug_otasuke
 
-if server_select is None:
-    __server__ = QuBE_Server_debug_otasuke()
+        return QuBE_Server_debug_otasuke()
+
+
+def main():
+    from labrad import util
 
-if __name__ == "__main__":
-    # Import Psyco if available
-    #  try:
-    #    import psyco
-    #    psyco.full()
-    #  except ImportError:
-    #    pass
-    #  print sys.argv
-    #  if sys.argv:
-    #    del sys.argv[1:]
     print("new qube server start.")
-    util.runServer(__server__)
+    util.runServer(create_server())
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ class QSConstants:
     REGLNK = "possible_links"
     REGSKEW = "chassis_skew"
     REGMASTERLNK = "master_link"
+    REGLAZY = "lazy_init"  # optional; initialize a chassis on first use if true
     #REGAPIPATH = "adi_api_path"
     SRVNAME = "QuBE Server"
     MNRNAME = "QuBE Manager"
@@ -33,6 +34,8 @@ class QSConstants:
     #    = 1/ADCBB_SAMPLE_R
     DAC_WORD_IVL = 8  # ns; DAC WORD in nanoseconds
     DAC_WORD_SAMPLE = 4  # Sample/(DAC word); DEBUG not used
+    DAC_QUANT_CHUNK = 65536  # Samples per chunk in waveform quantization
+    DAC_QUANT_NEAR = 1 - 2**-50  # Squared magnitudes above are checked with np.abs()
     #DAQ_CNCO_BITS = 48
     DAQ_LO_RESOL = 100  # - The minimum frequency resolution of
     #   the analog local oscillators in MHz.
@@ -67,11 +70,13 @@ class QSConstants:
     ACQ_WCOEF_BITS = 31  # - The number of vertical bits of the
     #   complex window coefficients.
     ACQ_WCBIT_POW_HALF = 2**30  # - equivalent to 2^(ACQ_WCOEF_BITS-1)
-    ACQ_MAXNUMCAPT = 8  # - Maximum iteration number of acquisi-
+    ACQ_MAXNUMCAPT = 4096  # - Maximum iteration number of acquisi-
     #   tion window in a single sequence.
-    #   DEBUG: There is no obvious reason to
-    #   set the number. We'd better to
-    #   change the number later.
+    #   It is equivalent to the maximum
+    #   number of sum sections of e7awgsw
+    #   CaptureParam.MAX_SUM_SECTIONS.
+    ACQ_COEF_CACHE = 1024  # - The number of designed coefficient
+    #   sets kept in the cache.
     ACQ_CAPW_RESOL = 8  # - The capture word in nano-seconds
     #   prior to the decimation. It is equi-
     #   valent to 4 * ADC_BBSAMP_IVL.
@@ -94,6 +99,18 @@ class QSConstants:
     DAQ_INITSHOTS = 1  # one shot
     DAQ_INITTOUT = 5  # seconds
     DAQ_INITSDLY = 1  # seconds; synchronization delay
+    DAQ_SDLY_MIN = 0.001  # seconds; lower bound of adaptive synchronization delay
+    DAQ_SDLY_MARGIN = 3.0  # multiplier to measured latency for adaptive delay
+    DAQ_SDLY_WINDOW = 32  # the number of latency samples kept per chassis
+    DAQ_SDLY_RETRY = 3  # retries with doubled delay when a start timing is missed
+    DAQ_TRAIN_MAX = 16  # entries of the start timing queue of a sequencer
+    SNAP_VERSION = 3  # session snapshot format; 3: npz, windows (MULP, MAXNUMCAPT, 2)
+    CLK_TRACK_IVL = 10  # seconds; sampling interval of chassis clocks
+    CLK_TRACK_WINDOW = 16  # the number of clock samples for the linear model
+    CLK_TRACK_MINSAMP = 4  # the minimum number of samples to use the model
+    CLK_TRACK_TTL = 60  # seconds; the model is stale without a newer sample
+    CLK_DRIFT_PPM = 100  # ppm; alert threshold of the clock rate deviation
+    CLK_RESID_TICKS = 12500  # clocks (100 us); alert threshold of the fit residual
     ACQ_INITMODE = "3"
     ACQ_INITWINDOW = [(0, 2048)]  # initial demodulation windows
     ACQ_INITFIRCOEF = np.array([1] * 8).astype(
@@ -101,11 +118,17 @@ class QSConstants:
     )  # initial complex FIR filter coeffs
     ACQ_INITWINDCOEF = np.array([]).astype(complex)  # initial complex window coeffs
     SYNC_CLOCK = 125 * 1000 * 1000  # synchronization clock
+    SYNC_GROUP_TOL = 125000  # clocks (1 ms); tolerance of the offset after a sync
+    SYNC_GROUP_RETRY = 2  # retries of group synchronization for the failed chassis
     DAC_CNXT_TAG = "awgs"  # used in the device context
     ACQ_CNXT_TAG = "muxs"  # used in the device context
     SYN_CNXT_TAG = "synch"  # used in the device context
     DAQ_TOUT_TAG = "timeout"  # used in the device context
     DAQ_SDLY_TAG = "sync_delay"  # used in the device context; synchronization delay
+    DAQ_PIPE_TAG = "pipeline"  # used in the device context; pipelined operation
+    DAQ_STAGE_TAG = "staged"  # used in the device context; devices with staged slot
+    DAQ_TRAIN_TAG = "trigger_train"  # used in the device context; queued start clocks
+    DAQ_ASDLY_TAG = "adaptive_sync_delay"  # used in the device context; (enable, margin)
     SRV_IPLSI_TAG = "ip_lsi"  # refered in the json config
     SRV_IPFPGA_TAG = "ip_fpga"  # refered in the json config
     SRV_IPCLK_TAG = "ip_sync"  # refered in the json config
@@ -135,6 +158,7 @@ class QSMessage:
     CHECKING_QUBEUNIT = "Checking {} ..."
     CNCTABLE_QUBEUNIT = "Link possible: {}"
     CONNECTED_CHANNEL = "Link : {}"
+    REGISTERED_CHANNEL = "Registered (initialized on first use): {}"
 
     ERR_HOST_NOTFOUND = "QuBE {} not found (ping unreachable). "
     ERR_DEV_NOT_OPEN = "Device is not open"
@@ -158,6 +182,20 @@ class QSMessage:
         + "The problem is {}. "
     )
     ERR_NOARMED_DAC = "No ready dac channels. "
+    ERR_SWEEP_POINT = "Invalid sweep point #{}. "
+    ALERT_CLOCK_MODEL = "ALERT: clock of {} drifts {:.1f} ppm with residual {:.0f}. "
+    ERR_SYNC_MISSED = "The scheduled start timing was missed {} times. "
+    ERR_SHORT_INTERVAL = "The interval must be longer than the run time of {} ns. "
+    ERR_TRAIN_CAPTURE = "A trigger train runs without capture. Clear {} from the context. "
+    ERR_SNAPSHOT = "{} is not a session snapshot of version {}. "
+    ERR_CHUNK_OFFSET = "The offset must be 0 or {}, the samples written to awg {}. "
+    ERR_CHUNK_INCOMPLETE = "Only {} of {} samples are written to awg {}. "
+    ERR_COEF_DESIGN = "Invalid parameters for {} coefficients: {}. "
+    ERR_CALIB_TRACES = (
+        "The calibration traces must be (captures, samples) of the same samples "
+        + "with 2 or more captures and distinct means per state. "
+    )
+    ERR_MIXED_FIELDS = "The fields must be all reads or all writes. "
 
     def __init__(self):
         pass
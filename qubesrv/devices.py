@@ -1,5 +1,6 @@
 import sys
 import copy
+import hashlib
 
 import numpy as np
 
@@ -10,12 +11,15 @@ from twisted.internet.defer import inlineCallbacks, returnValue
 from e7awgsw import (
     DspUnit,
     WaveSequence,
+    CaptureCtrl,
     CaptureParam,
 )
+from e7awgsw.memorymap import CaptureMasterCtrlRegs
 
 from quel_ic_config import Quel1Box
 
 from constants import QSConstants, QSMessage
+import dsp
 
 ############################################################
 #
@@ -43,9 +47,12 @@ class QuBE_DeviceBase(DeviceWrapper):
         self._role = role
         self._chassis = kw["chassis"]
 
-        print(QSMessage.CONNECTING_CHANNEL.format(name))
-        yield self.get_connected(*args, **kw)
-        yield print(QSMessage.CONNECTED_CHANNEL.format(self._name))
+        if kw.get("lazy", False):  # get_connected() is called on first use
+            yield print(QSMessage.REGISTERED_CHANNEL.format(name))
+        else:
+            print(QSMessage.CONNECTING_CHANNEL.format(name))
+            yield self.get_connected(*args, **kw)
+            yield print(QSMessage.CONNECTED_CHANNEL.format(self._name))
 
     @inlineCallbacks
     def get_connected(self, *args, **kwargs):  # @inlineCallbacks
@@ -64,6 +71,26 @@ class QuBE_DeviceBase(DeviceWrapper):
     def chassis_name(self):
         return self._chassis
 
+    def snapshot_state(self):
+        """
+        Collect the device state for a session snapshot.
+
+        The subclasses extend the dictionary with their own items through the
+        cooperative super() chain.
+        """
+        return dict()
+
+    def restore_state(self, state):
+        """
+        Restore the device state from a session snapshot.
+
+        Only the items which differ from the live values are written.
+
+        Returns:
+            writes : the number of items written.
+        """
+        return 0
+
     def static_check_value(self, value, resolution, multiplier=50, include_zero=False):
         resp = resolution > multiplier * abs(
             ((2 * value + resolution) % (2 * resolution)) - resolution
@@ -93,6 +120,10 @@ class QuBE_Control_FPGA(QuBE_DeviceBase):
             self._awg_ctrl = kw["awg_ctrl"]
             self._awg_ch_ids = kw["awg_ch_ids"]
             self._awg_chs = len(self._awg_ch_ids)
+            self._staged_wave_seq = dict()  # shadow slot for pipelined operation
+            self._chunk_buffer = dict()  # channel -> [int16 iq buffer, samples written]
+            self._waveform_digest = dict()  # channel -> digest of uploaded waveform
+            self._staged_waveform_digest = dict()
 
             self.__initialized = True
         except Exception as e:
@@ -146,6 +177,17 @@ class QuBE_Control_FPGA(QuBE_DeviceBase):
         return True
 
     def check_waveform(self, waveforms, channels):
+        """
+        Check waveforms and quantize them into the DAC format.
+
+        The amplitude check is done while quantizing, so the waveforms are read
+        only once. See dsp.quantize_waveforms().
+
+        Returns:
+            (True, chans, iq) : iq is int16 ndarray of (channels, samples, 2).
+            (False, help, None) : help is the number of the failed check in
+                                  QSMessage.ERR_INVALID_WAVD.
+        """
         chans, length = waveforms.shape
 
         help = 1
@@ -161,14 +203,15 @@ class QuBE_Control_FPGA(QuBE_DeviceBase):
             resp = 0 == length % block_restriction
             help += 1
         if resp:
-            resp = np.max(np.abs(waveforms)) < 1.0
+            iq = dsp.quantize_waveforms(waveforms)
+            resp = iq is not None
             help += 1
         if resp:
-            return (True, chans, length)
+            return (True, chans, iq)
         else:
             return (False, help, None)
 
-    def upload_waveform(self, waveforms, channels):
+    def build_wave_sequence(self, iq_samples):
 
         wait_words = int(
             (
@@ -178,15 +221,124 @@ class QuBE_Control_FPGA(QuBE_DeviceBase):
             // QSConstants.DAC_WORD_IVL
         )
 
-        for _waveform, _channel in zip(waveforms, channels):
-            wave_seq = WaveSequence(num_wait_words=0, num_repeats=self.number_of_shots)
-            iq_samples = list(zip(*self.static_DACify(_waveform)))
-            wave_seq.add_chunk(
-                iq_samples=iq_samples, num_blank_words=wait_words, num_repeats=1
-            )
+        wave_seq = WaveSequence(num_wait_words=0, num_repeats=self.number_of_shots)
+        wave_seq.add_chunk(
+            iq_samples=iq_samples, num_blank_words=wait_words, num_repeats=1
+        )
+        return wave_seq
+
+    def upload_waveform(self, iq_samples, channels):
+        for _iq, _channel in zip(iq_samples, channels):
+            wave_seq = self.build_wave_sequence(_iq)
             self._awg_ctrl.set_wave_sequence(self._awg_ch_ids[_channel], wave_seq)
+            self._waveform_digest[int(_channel)] = self.static_digest(_iq)
+        return True
+
+    @property
+    def waveform_digest(self):  # @property
+        return copy.copy(self._waveform_digest)
+
+    def static_digest(self, iq_samples):
+        return hashlib.blake2b(iq_samples.tobytes(), digest_size=16).hexdigest()
+
+    def stage_waveform(self, iq_samples, channels):
+        """
+        Stage waveforms in the shadow slot for pipelined operation.
+
+        The wave sequences are built in host memory while the current run is
+        in progress. They are written to the AWGs by flush_staged_parameters()
+        right after the current run stops.
+        """
+        for _iq, _channel in zip(iq_samples, channels):
+            wave_seq = self.build_wave_sequence(_iq)
+            self._staged_wave_seq[self._awg_ch_ids[_channel]] = wave_seq
+            self._staged_waveform_digest[int(_channel)] = self.static_digest(_iq)
+        return True
+
+    def waveform_chunk_position(self, channel):
+        """
+        The number of samples written to the chunk buffer of the channel. It is
+        zero if the buffer does not match the current sequence length.
+        """
+        length = self.sequence_length // QSConstants.DAC_WVSAMP_IVL
+        buf = self._chunk_buffer.get(channel)
+        if buf is None or length != len(buf[0]):
+            return 0
+        return buf[1]
+
+    def write_waveform_chunk(self, waveform, channel, offset):
+        """
+        Quantize a slice of a waveform into the chunk buffer of the channel.
+
+        The buffer is a host-side staging area. It holds the int16 DAC samples
+        of the whole sequence, i.e., a quarter of the complex waveform, and is
+        allocated when offset is zero. Slices have to be written in order.
+
+        Returns:
+            resp : False if the absolute value of a sample is not less than 1.
+        """
+        length = self.sequence_length // QSConstants.DAC_WVSAMP_IVL
+        if 0 == offset:
+            self._chunk_buffer[channel] = [np.empty((length, 2), dtype=np.int16), 0]
+        buf = self._chunk_buffer[channel]
+        end = offset + len(waveform)
+        iq = dsp.quantize_waveforms(
+            waveform[np.newaxis, :], out=buf[0][np.newaxis, offset:end]
+        )
+        if iq is None:
+            return False
+        buf[1] = end
         return True
 
+    def commit_waveform_chunks(self, channels):
+        """
+        Upload the chunk buffers of the channels to the AWGs and release them.
+        """
+        iq_samples = [self._chunk_buffer.pop(_c)[0] for _c in channels]
+        return self.upload_waveform(iq_samples, channels)
+
+    @property
+    def has_staged_parameters(self):  # @property
+        return 0 < len(self._staged_wave_seq)
+
+    def flush_staged_parameters(self):
+        for awg_id, wave_seq in self._staged_wave_seq.items():
+            self._awg_ctrl.set_wave_sequence(awg_id, wave_seq)
+        self._staged_wave_seq = dict()
+        self._waveform_digest.update(self._staged_waveform_digest)
+        self._staged_waveform_digest = dict()
+
+    def snapshot_state(self):
+        state = super(QuBE_Control_FPGA, self).snapshot_state()
+        state.update(
+            shots=self._shots,
+            reptime=self._reptime,
+            seqlen=self._seqlen,
+            waveform_digest=sorted(self.waveform_digest.items()),
+        )
+        return state
+
+    def restore_state(self, state):
+        writes = super(QuBE_Control_FPGA, self).restore_state(state)
+        for key in ["shots", "reptime", "seqlen"]:
+            if getattr(self, "_" + key) != state[key]:
+                setattr(self, "_" + key, state[key])
+                writes += 1
+        return writes
+
+    def stale_waveforms(self, state):
+        """
+        The awg channels whose uploaded waveform differs from the snapshot.
+
+        Waveforms themselves are not kept in a snapshot. The client has to upload
+        them again for the returned channels.
+        """
+        return [
+            _c
+            for _c, _d in state["waveform_digest"]
+            if self._waveform_digest.get(_c) != _d
+        ]
+
     def start_daq(self, awg_ids):  # OBSOLETED. For multi-chassis
         self._awg_ctrl.start_awgs(*awg_ids)  # operation, synchronization has
         # to be made using SequencerClinet.
@@ -199,12 +351,6 @@ class QuBE_Control_FPGA(QuBE_DeviceBase):
         self._awg_ctrl.terminate_awgs(*awg_ids)
         self._awg_ctrl.clear_awg_stop_flags(*awg_ids)
 
-    def static_DACify(self, waveform):
-        return (
-            (np.real(waveform) * QSConstants.DAC_BITS_POW_HALF).astype(int),
-            (np.imag(waveform) * QSConstants.DAC_BITS_POW_HALF).astype(int),
-        )
-
     def static_check_repetition_time(self, reptime_in_nanosec):
         resolution = QSConstants.DAQ_REPT_RESOL
         return self.static_check_value(reptime_in_nanosec, resolution)
@@ -288,6 +434,37 @@ class QuBE_Control_LSI(QuBE_DeviceBase):
     def set_dac_fine_frequency(self, channel, freq_in_mhz):
         self._css.set_dac_fnco(self._group, self._line, channel, 1e6 * freq_in_mhz)
 
+    def snapshot_state(self):
+        state = super(QuBE_Control_LSI, self).snapshot_state()
+        state.update(
+            lo_frequency=self.get_lo_frequency(),
+            sideband=self.get_mix_sideband(),
+            dac_coarse_frequency=self.get_dac_coarse_frequency(),
+            dac_fine_frequency=[
+                self.get_dac_fine_frequency(_c) for _c in range(self.number_of_awgs)
+            ],
+        )
+        return state
+
+    def restore_state(self, state):
+        writes = super(QuBE_Control_LSI, self).restore_state(state)
+        if not np.isclose(self.get_lo_frequency(), state["lo_frequency"]):
+            self.set_lo_frequency(state["lo_frequency"])
+            writes += 1
+        if self.get_mix_sideband() != state["sideband"]:
+            self.set_mix_sideband(state["sideband"])
+            writes += 1
+        if not np.isclose(
+            self.get_dac_coarse_frequency(), state["dac_coarse_frequency"]
+        ):
+            self.set_dac_coarse_frequency(state["dac_coarse_frequency"])
+            writes += 1
+        for _c, _f in enumerate(state["dac_fine_frequency"]):
+            if not np.isclose(self.get_dac_fine_frequency(_c), _f):
+                self.set_dac_fine_frequency(_c, _f)
+                writes += 1
+        return writes
+
     def static_check_lo_frequency(self, freq_in_mhz):
         resolution = QSConstants.DAQ_LO_RESOL
         return self.static_check_value(freq_in_mhz, resolution)
@@ -309,6 +486,138 @@ class QuBE_ControlLine(QuBE_Control_FPGA, QuBE_Control_LSI):
         yield
 
 
+class QuBEReadoutState:
+    """
+    Readout configuration of the mux channels of a readout line.
+
+    The windows and the quantized coefficients are held in preallocated arrays.
+    The getters return read-only views; use the setters to change them. Every
+    change of a mux channel increments its version so that a cache built from
+    the configuration can be checked cheaply.
+    """
+
+    __slots__ = (
+        "_windows",
+        "_num_windows",
+        "_fir_coefs",
+        "_num_fir_coefs",
+        "_window_coefs",
+        "_num_window_coefs",
+        "_modes",
+        "_versions",
+    )
+
+    def __init__(self):
+        muxs = QSConstants.ACQ_MULP
+        self._windows = np.zeros((muxs, QSConstants.ACQ_MAXNUMCAPT, 2), dtype=np.int32)
+        self._num_windows = np.zeros(muxs, dtype=np.int64)
+        self._fir_coefs = np.zeros((muxs, QSConstants.ACQ_MAX_FCOEF), dtype=complex)
+        self._num_fir_coefs = np.zeros(muxs, dtype=np.int64)
+        self._window_coefs = np.zeros((muxs, QSConstants.ACQ_MAX_WCOEF), dtype=complex)
+        self._num_window_coefs = np.zeros(muxs, dtype=np.int64)
+        self._modes = np.full(muxs, QSConstants.ACQ_INITMODE, dtype="<U1")
+        self._versions = np.zeros(muxs, dtype=np.int64)
+
+        for mux in range(muxs):
+            self.set_window(mux, QSConstants.ACQ_INITWINDOW)
+            self.set_fir_coefs(mux, QSConstants.ACQ_INITFIRCOEF)
+            self.set_window_coefs(mux, QSConstants.ACQ_INITWINDCOEF)
+        self._versions[:] = 0
+
+    @staticmethod
+    def _readonly(array):
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    @property
+    def number_of_windows(self):  # @property
+        return self._readonly(self._num_windows)
+
+    def window(self, mux):
+        """(number of windows, 2) array of (start, end) in nano-seconds."""
+        return self._readonly(self._windows[mux, : self._num_windows[mux]])
+
+    def set_window(self, mux, windows):
+        windows = np.asarray(windows, dtype=np.int32).reshape(-1, 2)
+        self._windows[mux, : len(windows)] = windows
+        self._windows[mux, len(windows) :] = 0
+        self._num_windows[mux] = len(windows)
+        self._versions[mux] += 1
+
+    def set_number_of_windows(self, mux, number):
+        """Keep the first [number] windows. Windows are added by set_window()."""
+        if number > self._num_windows[mux]:
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format(
+                    "Acquisition number of windows", 1, self._num_windows[mux]
+                )
+            )
+        self._windows[mux, number:] = 0
+        self._num_windows[mux] = number
+        self._versions[mux] += 1
+
+    def fir_coefs(self, mux):
+        """Quantized complex FIR filter coefficients."""
+        return self._readonly(self._fir_coefs[mux, : self._num_fir_coefs[mux]])
+
+    def set_fir_coefs(self, mux, coefs):
+        self._fir_coefs[mux, : len(coefs)] = coefs
+        self._fir_coefs[mux, len(coefs) :] = 0
+        self._num_fir_coefs[mux] = len(coefs)
+        self._versions[mux] += 1
+
+    def window_coefs(self, mux):
+        """Quantized complex window coefficients."""
+        return self._readonly(self._window_coefs[mux, : self._num_window_coefs[mux]])
+
+    def set_window_coefs(self, mux, coefs):
+        self._window_coefs[mux, : len(coefs)] = coefs
+        self._window_coefs[mux, len(coefs) :] = 0
+        self._num_window_coefs[mux] = len(coefs)
+        self._versions[mux] += 1
+
+    @property
+    def modes(self):  # @property
+        return self._readonly(self._modes)
+
+    def set_mode(self, mux, mode):
+        self._modes[mux] = mode
+        self._versions[mux] += 1
+
+    @property
+    def versions(self):  # @property
+        return self._readonly(self._versions)
+
+    def export(self):
+        """Copy of the configuration for a session snapshot."""
+        return {_k: getattr(self, _k).copy() for _k in self.__slots__}
+
+    def restore(self, state):
+        """
+        Restore the configuration from export().
+
+        Only the host copy is changed. The capture units have to be configured
+        again for the returned mux channels.
+
+        Returns:
+            muxchs : the mux channels changed.
+        """
+        muxchs = list()
+        for mux in range(QSConstants.ACQ_MULP):
+            changed = False
+            for key in self.__slots__:
+                if "_versions" != key and not np.array_equal(
+                    getattr(self, key)[mux], state[key][mux]
+                ):
+                    getattr(self, key)[mux] = state[key][mux]
+                    changed = True
+            if changed:
+                self._versions[mux] += 1
+                muxchs.append(mux)
+        return muxchs
+
+
 class QuBE_ReadoutLine(QuBE_ControlLine):
 
     @inlineCallbacks
@@ -321,6 +630,8 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
             self._cap_ctrl = kw["cap_ctrl"]
             self._cap_mod_id = kw["cap_mod_id"]
             self._cap_unit = kw["capture_units"]
+            self._staged_capture_params = dict()  # shadow slot for pipelined operation
+            self._latched_waveforms = dict()  # captured data held in host memory
 
             #print("QuBE_ReadoutLine kw:", kw)
             self._rx_coarse_frequency = self.get_adc_coarse_frequency()
@@ -331,18 +642,7 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
             print(sys._getframe().f_code.co_name, e)
 
         if self.__initialized:
-            self._window = [
-                QSConstants.ACQ_INITWINDOW for i in range(QSConstants.ACQ_MULP)
-            ]
-            self._window_coefs = [
-                QSConstants.ACQ_INITWINDCOEF for i in range(QSConstants.ACQ_MULP)
-            ]
-            self._fir_coefs = [
-                QSConstants.ACQ_INITFIRCOEF for i in range(QSConstants.ACQ_MULP)
-            ]
-            self._acq_mode = [
-                QSConstants.ACQ_INITMODE for i in range(QSConstants.ACQ_MULP)
-            ]
+            self._readout = QuBEReadoutState()
 
     def get_capture_module_id(self):
         return self._cap_mod_id
@@ -350,35 +650,36 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
     def get_capture_unit_id(self, mux_channel):
         return self._cap_unit[mux_channel]
 
+    @property
+    def readout_state(self):  # @property
+        return self._readout
+
     @property
     def acquisition_window(self):  # @property
-        return copy.copy(self._window)
+        return tuple(self._readout.window(_m) for _m in range(QSConstants.ACQ_MULP))
 
     def set_acquisition_window(self, mux, window):
-        self._window[mux] = window
+        self._readout.set_window(mux, window)
+
+    def set_acquisition_number_of_windows(self, mux, number):
+        self._readout.set_number_of_windows(mux, number)
 
     @property
     def acquisition_mode(self):  # @property, only referenced in QuBE_Server
-        return copy.copy(self._acq_mode)  # .acquisition_mode() for @setting 303
+        return self._readout.modes  # .acquisition_mode() for @setting 303
 
     def set_acquisition_mode(self, mux, mode):
-        self._acq_mode[mux] = mode
-
-    def set_acquisition_fir_coefficient(self, muxch, coeffs):
-        def fircoef_DACify(coeffs):
-            return (np.real(coeffs) * QSConstants.ACQ_FCBIT_POW_HALF).astype(
-                int
-            ) + 1j * (np.imag(coeffs) * QSConstants.ACQ_FCBIT_POW_HALF).astype(int)
+        self._readout.set_mode(mux, mode)
 
-        self._fir_coefs[muxch] = fircoef_DACify(coeffs)
+    def set_acquisition_fir_coefficient(self, muxch, coeffs, quantized=False):
+        if not quantized:
+            coeffs = dsp.quantize_coefficients(coeffs, QSConstants.ACQ_FCBIT_POW_HALF)
+        self._readout.set_fir_coefs(muxch, coeffs)
 
-    def set_acquisition_window_coefficient(self, muxch, coeffs):
-        def window_DACify(coeffs):
-            return (np.real(coeffs) * QSConstants.ACQ_WCBIT_POW_HALF).astype(
-                int
-            ) + 1j * (np.imag(coeffs) * QSConstants.ACQ_WCBIT_POW_HALF).astype(int)
-
-        self._window_coefs[muxch] = window_DACify(coeffs)
+    def set_acquisition_window_coefficient(self, muxch, coeffs, quantized=False):
+        if not quantized:
+            coeffs = dsp.quantize_coefficients(coeffs, QSConstants.ACQ_WCBIT_POW_HALF)
+        self._readout.set_window_coefs(muxch, coeffs)
 
     def upload_readout_parameters(self, muxchs):
         """
@@ -405,47 +706,8 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
         - The capture word is defined as the four multiple of sampling points. It
           corresponds to 4 * ADC_BBSAMP_IVL = ACQ_CAPW_RESOL (nanoseconds).
         """
-        repetition_word = int(
-            (self.repetition_time + QSConstants.ACQ_CAPW_RESOL // 2)
-            // QSConstants.ACQ_CAPW_RESOL
-        )
         for mux in muxchs:
-            param = CaptureParam()
-            win_word = list()
-            for _s, _e in self.acquisition_window[
-                mux
-            ]:  # flatten window (start,end) to a series
-                # of timestamps
-                win_word.append(
-                    int(
-                        (_s + QSConstants.ACQ_CAPW_RESOL / 2)
-                        // QSConstants.ACQ_CAPW_RESOL
-                    )
-                )
-                win_word.append(
-                    int(
-                        (_e + QSConstants.ACQ_CAPW_RESOL / 2)
-                        // QSConstants.ACQ_CAPW_RESOL
-                    )
-                )
-            win_word.append(repetition_word)
-
-            param.num_integ_sections = int(self.number_of_shots)
-            _s0 = win_word.pop(0)
-            param.capture_delay = _s0
-            win_word[-1] += _s0  # win_word[-1] is the end time of a sin-
-            # gle sequence. As the repeat duration
-            # is offset by capture_delay, we have to
-            # add the capture_delay time.
-            while len(win_word) > 1:
-                _e = win_word.pop(0)
-                _s = win_word.pop(0)
-                blank_length = _s - _e
-                section_length = _e - _s0
-                _s0 = _s
-                param.add_sum_section(section_length, blank_length)
-
-            self.configure_readout_mode(mux, param, self._acq_mode[mux])
+            param = self.build_capture_param(mux)
             # import pickle
             # import base64
             # print('mux setup')
@@ -453,6 +715,57 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
             self._cap_ctrl.set_capture_params(self._cap_unit[mux], param)
         return True
 
+    def build_capture_param(self, mux):
+        sections = dsp.compile_sum_sections(
+            self._readout.window(mux),
+            self.repetition_time,
+            limits=(
+                CaptureParam.MAX_SUM_SECTIONS,
+                CaptureParam.MAX_SUM_SECTION_LEN,
+                CaptureParam.MAX_POST_BLANK_LEN,
+                CaptureParam.MAX_CAPTURE_DELAY,
+            ),
+        )
+        if sections is None:
+            raise ValueError(QSMessage.ERR_INVALID_WIND)
+        capture_delay, section_lengths, blank_lengths = sections
+
+        param = CaptureParam()
+        param.num_integ_sections = int(self.number_of_shots)
+        param.capture_delay = capture_delay
+        for section_length, blank_length in zip(
+            section_lengths.tolist(), blank_lengths.tolist()
+        ):
+            param.add_sum_section(section_length, blank_length)
+
+        self.configure_readout_mode(mux, param, self._readout.modes[mux])
+        return param
+
+    def stage_readout_parameters(self, muxchs):
+        """
+        Stage readout parameters in the shadow slot for pipelined operation.
+
+        The capture parameters are prepared in host memory and written to the
+        capture units by flush_staged_parameters() after the current run.
+        """
+        for mux in muxchs:
+            param = self.build_capture_param(mux)
+            self._staged_capture_params[self._cap_unit[mux]] = param
+        return True
+
+    @property
+    def has_staged_parameters(self):  # @property
+        return (
+            super(QuBE_ReadoutLine, self).has_staged_parameters
+            or 0 < len(self._staged_capture_params)
+        )
+
+    def flush_staged_parameters(self):
+        super(QuBE_ReadoutLine, self).flush_staged_parameters()
+        for unit_id, param in self._staged_capture_params.items():
+            self._cap_ctrl.set_capture_params(unit_id, param)
+        self._staged_capture_params = dict()
+
     def configure_readout_mode(self, mux, param, mode):
         """
         Configure readout parametes to acquisition modes.
@@ -495,7 +808,7 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
         """
         dsp = list()
         if decimation:
-            param.complex_fir_coefs = list(self._fir_coefs[mux])
+            param.complex_fir_coefs = list(self._readout.fir_coefs(mux))
             dsp.append(DspUnit.COMPLEX_FIR)
             dsp.append(DspUnit.DECIMATION)
         return dsp
@@ -539,13 +852,36 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
         if summation:
             param.sum_start_word_no = 0
             param.num_words_to_sum = CaptureParam.MAX_SUM_SECTION_LEN
-            param.complex_window_coefs = list(self._window_coefs[mux])
+            param.complex_window_coefs = list(self._readout.window_coefs(mux))
             dsp.append(DspUnit.COMPLEX_WINDOW)
             dsp.append(DspUnit.SUM)
         else:
             pass
         return dsp
 
+    def snapshot_state(self):
+        state = super(QuBE_ReadoutLine, self).snapshot_state()
+        state.update(
+            readout=self._readout.export(),
+            adc_coarse_frequency=self.get_adc_coarse_frequency(),
+        )
+        return state
+
+    def restore_state(self, state):
+        timing = (self.number_of_shots, self.repetition_time)
+        writes = super(QuBE_ReadoutLine, self).restore_state(state)
+        muxchs = self._readout.restore(state["readout"])
+        writes += len(muxchs)
+        if timing != (self.number_of_shots, self.repetition_time):
+            muxchs = range(QSConstants.ACQ_MULP)  # capture params depend on them
+        self.upload_readout_parameters(muxchs)
+        if not np.isclose(
+            self.get_adc_coarse_frequency(), state["adc_coarse_frequency"]
+        ):
+            self.set_adc_coarse_frequency(state["adc_coarse_frequency"])
+            writes += 1
+        return writes
+
     def terminate_acquisition(self, unit_ids):
         self._cap_ctrl.terminate_capture_units(*unit_ids)
 
@@ -567,17 +903,59 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
 
         vault = []
         for mux in muxchs:
-            data = self.download_single_waveform(mux)
-            vault.append(data)
+            vault.append(self.captured_data(mux))
         return np.vstack(vault)
 
+    def download_summed_values(self, muxchs):
+        """
+        Download the summed values of the acquisition windows.
+
+        In the modes with summation, the capture unit outputs a value per window,
+        and per shot without averaging. The values are arranged by shots and
+        windows.
+
+        Args:
+            muxchs : List[int]
+        Returns:
+            values : List of complex ndarray of (shots, windows). The number of
+                     shots is one with averaging.
+        """
+        vault = []
+        for mux in muxchs:
+            data = self.captured_data(mux)
+            vault.append(data.reshape(-1, self._readout.number_of_windows[mux]))
+        return vault
+
+    def captured_data(self, mux):
+        if mux in self._latched_waveforms:
+            return self._latched_waveforms[mux]
+        return self.download_single_waveform(mux)
+
+    def latch_waveform(self, unit_ids):
+        """
+        Keep captured datapoints in host memory.
+
+        In pipelined operation, the next run starts right after the current run
+        stops and overwrites the capture memory. latch_waveform() copies the data
+        of the given capture units beforehand so that download_waveform() returns
+        the result of the finished run.
+        """
+        self._latched_waveforms = dict()
+        for mux, unit_id in enumerate(self._cap_unit):
+            if unit_id in unit_ids:
+                self._latched_waveforms[mux] = self.download_single_waveform(mux)
+
+    def clear_latched_waveform(self):
+        self._latched_waveforms = dict()
+
     def download_single_waveform(self, muxch):
         capture_unit = self._cap_unit[muxch]
 
         n_of_samples = self._cap_ctrl.num_captured_samples(capture_unit)
         iq_tuple_data = self._cap_ctrl.get_capture_data(capture_unit, n_of_samples)
 
-        return np.array([(_i + 1j * _q) for _i, _q in iq_tuple_data]).astype(complex)
+        iq = np.asarray(iq_tuple_data, dtype=float).reshape(-1, 2)
+        return iq.view(complex).ravel()  # (i, q) pairs are laid out as complex
 
     def set_trigger_board(self, trigger_board, enabled_capture_units):
         self._cap_ctrl.select_trigger_awg(self._cap_mod_id, trigger_board)
@@ -599,24 +977,18 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
         return True if 0 <= mux and mux < QSConstants.ACQ_MULP else False
 
     def static_check_acquisition_windows(self, list_of_windows):
-        def check_value(w):
-            return False if 0 != w % QSConstants.ACQ_CAPW_RESOL else True
-
-        def check_duration(start, end):
-            return (
-                False
-                if start > end or end - start > QSConstants.ACQ_MAXWINDOW
-                else True
-            )
-
-        if 0 != list_of_windows[0][0] % QSConstants.ACQ_CAST_RESOL:
+        windows = np.asarray(list_of_windows).reshape(-1, 2)
+        if not 0 < len(windows) <= QSConstants.ACQ_MAXNUMCAPT:
+            return False
+        if 0 != windows[0, 0] % QSConstants.ACQ_CAST_RESOL:
             return False
 
-        for _s, _e in list_of_windows:
-            if not check_value(_s) or not check_value(_e) or not check_duration(_s, _e):
-                return False
-
-        return True
+        durations = windows[:, 1] - windows[:, 0]
+        return bool(
+            (0 == windows % QSConstants.ACQ_CAPW_RESOL).all()
+            and (0 <= durations).all()
+            and (QSConstants.ACQ_MAXWINDOW >= durations).all()
+        )
 
     def static_check_acquisition_fir_coefs(self, coeffs):
         length = len(coeffs)
@@ -634,3 +1006,35 @@ class QuBE_ReadoutLine(QuBE_ControlLine):
             resp = 1.0 > np.max(np.abs(coeffs))
         return resp
 
+
+############################################################
+#
+# e7awgsw wrappers
+#
+class QuBECaptureCtrl(CaptureCtrl):
+
+    def terminate_capture_units(self, *capture_unit_id_list):
+        with self._CaptureCtrl__flock:
+            self._CaptureCtrl__select_ctrl_target(*capture_unit_id_list)
+            self._CaptureCtrl__reg_access.write_bits(
+                CaptureMasterCtrlRegs.ADDR,
+                CaptureMasterCtrlRegs.Offset.CTRL,
+                CaptureMasterCtrlRegs.Bit.CTRL_TERMINATE,
+                1,
+                0,
+            )
+            self._CaptureCtrl__reg_access.write_bits(
+                CaptureMasterCtrlRegs.ADDR,
+                CaptureMasterCtrlRegs.Offset.CTRL,
+                CaptureMasterCtrlRegs.Bit.CTRL_TERMINATE,
+                1,
+                1,
+            )
+            self._CaptureCtrl__reg_access.write_bits(
+                CaptureMasterCtrlRegs.ADDR,
+                CaptureMasterCtrlRegs.Offset.CTRL,
+                CaptureMasterCtrlRegs.Bit.CTRL_TERMINATE,
+                1,
+                0,
+            )
+            self._CaptureCtrl__deselect_ctrl_target(*capture_unit_id_list)
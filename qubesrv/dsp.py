@@ -0,0 +1,259 @@
+import functools
+
+import numpy as np
+
+from constants import QSConstants
+
+############################################################
+#
+# NUMERICAL KERNELS
+#
+# The kernels depend only on numpy so that they can be used and benchmarked
+# without the device libraries.
+#
+def quantize_waveforms(waveforms, chunk=QSConstants.DAC_QUANT_CHUNK, out=None):
+    """
+    Validate and quantize complex waveforms in a single pass.
+
+    The amplitude check and the conversion to the DAC format are done chunk by
+    chunk so that the temporary arrays stay as small as a chunk. The squared
+    magnitude is compared instead of np.abs() to avoid square roots. Only the
+    samples whose squared magnitude is within a few ulps of 1 or above are
+    checked with np.abs(), so that the result is the same as
+    np.max(np.abs(waveforms)) < 1.
+
+    Args:
+        waveforms : complex ndarray of (channels, samples)
+        chunk     : the number of samples processed at once
+        out       : int16 ndarray of (channels, samples, 2) to write into. A new
+                    array is allocated if None. The content is undefined when
+                    None is returned.
+    Returns:
+        iq        : int16 ndarray of (channels, samples, 2), the last axis holds
+                    I and Q. None if the absolute value of a sample is not less
+                    than 1.
+    """
+    chans, length = waveforms.shape
+    iq = np.empty((chans, length, 2), dtype=np.int16) if out is None else out
+    mag2 = np.empty((chans, min(chunk, length)))
+    work = np.empty((chans, min(chunk, length)))
+
+    for _s in range(0, length, chunk):
+        _e = min(_s + chunk, length)
+        _m, _w = mag2[:, : _e - _s], work[:, : _e - _s]
+        real, imag = waveforms[:, _s:_e].real, waveforms[:, _s:_e].imag  # views
+        np.multiply(real, real, out=_m)
+        np.multiply(imag, imag, out=_w)
+        _m += _w
+        near = ~(_m <= QSConstants.DAC_QUANT_NEAR)  # including nan
+        if near.any() and not (np.abs(waveforms[:, _s:_e][near]) < 1.0).all():
+            return None
+        np.multiply(
+            real, QSConstants.DAC_BITS_POW_HALF, out=iq[:, _s:_e, 0], casting="unsafe"
+        )
+        np.multiply(
+            imag, QSConstants.DAC_BITS_POW_HALF, out=iq[:, _s:_e, 1], casting="unsafe"
+        )
+    return iq
+
+
+def compile_sum_sections(windows, repetition_time, limits=None):
+    """
+    Compile acquisition windows into the sum sections of a capture parameter.
+
+    The first window starts at the capture delay. Each window is a sum section
+    followed by a blank up to the start of the next window. The blank of the last
+    window lasts until the first window of the next repetition.
+
+    Args:
+        windows         : int ndarray of (windows, 2). (start, end) in nano-seconds.
+        repetition_time : int. The repetition time in nano-seconds.
+        limits          : tuple of (sections, section length, blank length, capture
+                          delay), the maximum values in capture words. Not checked
+                          if None.
+    Returns:
+        sections        : (capture delay, section lengths, blank lengths) in capture
+                          words. The lengths are int ndarrays. None if a value is
+                          out of the limits.
+    """
+    resol = QSConstants.ACQ_CAPW_RESOL
+    words = (np.asarray(windows, dtype=np.int64).reshape(-1, 2) + resol // 2) // resol
+    starts, ends = words[:, 0], words[:, 1]
+    capture_delay = int(starts[0])
+
+    next_starts = np.empty_like(starts)
+    next_starts[:-1] = starts[1:]
+    next_starts[-1] = (repetition_time + resol // 2) // resol + capture_delay
+    section_lengths = ends - starts
+    blank_lengths = next_starts - ends
+
+    if limits is not None:
+        max_sections, max_section_len, max_blank_len, max_delay = limits
+        if (
+            len(words) > max_sections
+            or capture_delay > max_delay
+            or section_lengths.min() < 1
+            or section_lengths.max() > max_section_len
+            or blank_lengths.min() < 1
+            or blank_lengths.max() > max_blank_len
+        ):
+            return None
+    return capture_delay, section_lengths, blank_lengths
+
+
+COEF_TYPES = ("gaussian", "raised_cosine", "matched", "kaiser")
+
+
+def _coefficient_format(target):
+    """(sampling interval in ns, maximum length, full scale, carrier sign)"""
+    if "fir" == target:
+        return (
+            1000 / QSConstants.ADCBB_SAMPLE_R,
+            QSConstants.ACQ_MAX_FCOEF,
+            QSConstants.ACQ_FCBIT_POW_HALF,
+            1,
+        )
+    return (
+        1000 / QSConstants.ADCDCM_SAMPLE_R,
+        QSConstants.ACQ_MAX_WCOEF,
+        QSConstants.ACQ_WCBIT_POW_HALF,
+        -1,
+    )
+
+
+@functools.lru_cache(maxsize=QSConstants.ACQ_COEF_CACHE)
+def design_coefficients(target, kind, frequency, length, params=()):
+    """
+    Design and quantize FIR or window coefficients.
+
+    The envelope of the kind is modulated by the carrier of the base-band
+    frequency; exp(+j 2 pi f t) for the FIR filter and exp(-j 2 pi f t) for the
+    demodulation window, as debug_auto_acquisition_*_coefficients() do. The
+    peak is scaled to 1 - 1e-3 of the full scale and truncated to the integer
+    format of set_acquisition_*_coefficient(). Results are cached by the
+    arguments, so the params must be hashable.
+
+    Args:
+        target    : str. "fir" or "window".
+        kind      : str. One of COEF_TYPES.
+                    - gaussian      : params = (sigma in ns,)
+                    - raised_cosine : params = (roll-off ratio 0-1,), a flat top
+                                      with raised-cosine edges.
+                    - matched       : params = reference trace of complex samples
+                                      at the sampling rate of the target.
+                    - kaiser        : params = (beta,)
+        frequency : float. The base-band frequency in MHz.
+        length    : int. The number of coefficients.
+        params    : tuple. See kind.
+    Returns:
+        coeffs    : read-only complex ndarray of the quantized coefficients. None if
+                    the kind, length or params are invalid.
+    """
+    interval, max_length, full_scale, sign = _coefficient_format(target)
+    if kind not in COEF_TYPES or not 0 < length <= max_length:
+        return None
+
+    n = np.arange(length)
+    x = n - (length - 1) / 2  # symmetric in center
+    if "gaussian" == kind:
+        (sigma,) = params
+        envelope = np.exp(-0.5 * (x * interval / sigma) ** 2)
+    elif "raised_cosine" == kind:
+        (rolloff,) = params
+        edge = rolloff * length / 2
+        distance = np.minimum(n, length - 1 - n)  # from the nearest edge
+        envelope = np.ones(length)
+        if 0 < edge:
+            envelope = np.where(
+                distance < edge, 0.5 * (1 - np.cos(np.pi * (distance + 0.5) / edge)), 1
+            )
+    elif "kaiser" == kind:
+        (beta,) = params
+        envelope = np.kaiser(length, beta)
+    else:
+        trace = np.asarray(params, dtype=complex)
+        if len(trace) < length:
+            return None
+        trace = trace[:length]
+        envelope = np.conj(trace[::-1] if "fir" == target else trace)
+
+    coeffs = envelope * np.exp(sign * 2j * np.pi * frequency * 1e-3 * interval * n)
+    peak = np.max(np.abs(coeffs))
+    if not 0 < peak < np.inf:
+        return None
+    coeffs = quantize_coefficients(coeffs * ((1 - 1e-3) / peak), full_scale)
+    coeffs.flags.writeable = False  # shared by the cache
+    return coeffs
+
+
+def quantize_coefficients(coeffs, full_scale):
+    """
+    Truncate complex coefficients of the absolute values less than 1 to integers.
+
+    It gives the same values as set_acquisition_fir_coefficient() and
+    set_acquisition_window_coefficient() with full_scale of ACQ_FCBIT_POW_HALF
+    and ACQ_WCBIT_POW_HALF, respectively.
+    """
+    coeffs = np.asarray(coeffs)
+    return (np.real(coeffs) * full_scale).astype(int) + 1j * (
+        np.imag(coeffs) * full_scale
+    ).astype(int)
+
+
+def matched_window(traces0, traces1, whiten=False, reference=None):
+    """
+    Integration weights which best separate two states from calibration traces.
+
+    The weights are the difference of the mean traces, w = mu1 - mu0, or
+    C^-1 (mu1 - mu0) with the noise covariance C when whitened. C is estimated
+    from the deviations of the traces from their means and regularized with
+    1e-3 of its mean diagonal. The summed value of a window is sum(coef * x),
+    hence the coefficients are the conjugate of the weights.
+
+    The SNR of a window is |sum(coef * (mu1 - mu0))|^2 over the variance of
+    sum(coef * noise). It is evaluated with the quantized coefficients.
+
+    Args:
+        traces0   : complex ndarray of (captures, samples) for the first state.
+        traces1   : complex ndarray of (captures, samples) for the second state.
+        whiten    : bool. Whiten the noise with the covariance.
+        reference : complex ndarray of the coefficients to compare with. Zero
+                    padded or truncated to the samples. A rectangular window if
+                    None or all zero.
+    Returns:
+        coeffs    : complex ndarray of the coefficients quantized to the
+                    ACQ_WCBIT_POW_HALF format.
+        gain      : float. The SNR with coeffs over the SNR with reference.
+    """
+    mean0, mean1 = traces0.mean(axis=0), traces1.mean(axis=0)
+    diff = mean1 - mean0
+    noise = np.concatenate([traces0 - mean0, traces1 - mean1])
+    length = len(diff)
+
+    weights = diff
+    if whiten:
+        cov = noise.T @ noise.conj() / max(len(noise) - 2, 1)  # E[n n^H]
+        cov += 1e-3 * np.real(np.trace(cov)) / length * np.eye(length)
+        weights = np.linalg.solve(cov, diff)
+
+    peak = np.max(np.abs(weights))
+    if not 0 < peak < np.inf:
+        return None, 0.0
+    coeffs = quantize_coefficients(
+        np.conj(weights) * ((1 - 1e-3) / peak), QSConstants.ACQ_WCBIT_POW_HALF
+    )
+
+    base = np.ones(length, dtype=complex)
+    if reference is not None and np.any(reference):
+        reference = np.asarray(reference, dtype=complex)[:length]
+        base = np.zeros(length, dtype=complex)
+        base[: len(reference)] = reference
+
+    def snr(coef):
+        signal = np.abs(coef @ diff) ** 2
+        variance = np.mean(np.abs(noise @ coef) ** 2)
+        return signal / variance if 0 < variance else np.inf
+
+    base_snr = snr(base)
+    gain = snr(coeffs.astype(complex)) / base_snr if 0 < base_snr else np.inf
+    return coeffs, float(gain)
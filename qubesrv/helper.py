@@ -1,6 +1,15 @@
 import sys
 import numpy as np
 
+from e7awgsw import AWG, CaptureUnit
+from e7awgsw.memorymap import (
+    AwgMasterCtrlRegs,
+    AwgCtrlRegs,
+    WaveParamRegs,
+    CaptureMasterCtrlRegs,
+    CaptureCtrlRegs,
+    CaptureParamRegs,
+)
 from labrad.server import setting
 from twisted.internet.defer import inlineCallbacks, returnValue
 
@@ -8,6 +17,7 @@ from constants import QSConstants, QSMessage
 from devices import QuBE_Control_FPGA, QuBE_Control_LSI, QuBE_ControlLine, QuBE_ReadoutLine
 
 from server import QuBE_Server
+from utils import RegisterBulkAccess
 
 class QuBE_Device_debug_otasuke(QuBE_Control_FPGA, QuBE_Control_LSI):
 
@@ -73,7 +83,7 @@ class QuBE_Server_debug_otasuke(QuBE_Server):
         QuBE_Server.__init__(self, *args, **kw)
 
     def instantiateChannel(self, name, channels, awg_ctrl, cap_ctrl, lsi_ctrl, info):
-        devices = super(QuBE_Server_debug_otasuke, self).instantiateChannel(
+        index, devices = super(QuBE_Server_debug_otasuke, self).instantiateChannel(
             name, channels, awg_ctrl, cap_ctrl, lsi_ctrl, info
         )
         revised = []
@@ -84,7 +94,7 @@ class QuBE_Server_debug_otasuke(QuBE_Server):
             )
             kw.update(_kw)
             revised.append((name, args, kw))
-        return revised
+        return index, revised
 
     @setting(
         502,
@@ -117,14 +127,13 @@ class QuBE_Server_debug_otasuke(QuBE_Server):
             data  : w   Data. Read operation is performed if None
         """
         dev = self.selectedDevice(c)
-        reg = (
+        reg = RegisterBulkAccess(
             dev._awg_ctrl._AwgCtrl__reg_access
         )  # DEBUG _awg_ctrl is a protected member
         if data is None:
-            data = reg.read_bits(addr, offset, pos, bits)
-            return data
+            return reg.read_fields([(addr, offset, pos, bits)])[0]
         else:
-            reg.write_bits(addr, offset, pos, bits, data)
+            reg.write_fields([(addr, offset, pos, bits, data)])
         return 0
 
     @setting(
@@ -162,14 +171,13 @@ class QuBE_Server_debug_otasuke(QuBE_Server):
             raise Exception(
                 QSMessage.ERR_INVALID_DEV.format("readout", dev.device_name)
             )
-        reg = (
+        reg = RegisterBulkAccess(
             dev._cap_ctrl._CaptureCtrl__reg_access
         )  # DEBUG _cap_ctrl is a protected member
         if data is None:
-            data = reg.read_bits(addr, offset, pos, bits)
-            return data
+            return reg.read_fields([(addr, offset, pos, bits)])[0]
         else:
-            reg.write_bits(addr, offset, pos, bits, data)
+            reg.write_fields([(addr, offset, pos, bits, data)])
         return 0
 
     @setting(
@@ -325,3 +333,133 @@ class QuBE_Server_debug_otasuke(QuBE_Server):
             output = yield dev.get_microwave_switch()
         returnValue(output)
 
+    def _debug_register_access(self, c, role):
+        dev = self.selectedDevice(c)
+        if QSConstants.CNL_READ_VAL == role:
+            if QSConstants.CNL_READ_VAL != dev.device_role:
+                raise Exception(
+                    QSMessage.ERR_INVALID_DEV.format("readout", dev.device_name)
+                )
+            # DEBUG _cap_ctrl is a protected member
+            return RegisterBulkAccess(dev._cap_ctrl._CaptureCtrl__reg_access)
+        # DEBUG _awg_ctrl is a protected member
+        return RegisterBulkAccess(dev._awg_ctrl._AwgCtrl__reg_access)
+
+    def _debug_batch(self, reg, fields):
+        fields = [tuple(_f) for _f in fields]
+        if 1 < len({len(_f) for _f in fields}):
+            raise ValueError(QSMessage.ERR_MIXED_FIELDS)
+        elif fields and 5 == len(fields[0]):
+            reg.write_fields(fields)
+            return []
+        return reg.read_fields(fields)
+
+    @setting(
+        506,
+        "DEBUG AWG REG Batch",
+        fields=["*(wwww)", "*(wwwww)"],
+        returns=["*w"],
+    )
+    def debug_awg_ctrl_reg_batch(self, c, fields):
+        """
+        Read or write a list of AWG register fields in one call.
+
+        The fields at consecutive registers are accessed together in a single
+        transaction. See debug_awg_ctrl_reg() for the registers.
+
+        Args:
+            fields : *(wwww) or *(wwwww)
+                (addr, offset, pos, bits) to read, or
+                (addr, offset, pos, bits, data) to write.
+        Returns:
+            values : *w
+                The values of the fields read. Empty for writes.
+        """
+        reg = self._debug_register_access(c, QSConstants.CNL_CTRL_VAL)
+        return self._debug_batch(reg, fields)
+
+    @setting(
+        507,
+        "DEBUG CAP REG Batch",
+        fields=["*(wwww)", "*(wwwww)"],
+        returns=["*w"],
+    )
+    def debug_cap_ctrl_reg_batch(self, c, fields):
+        """
+        Read or write a list of capture register fields in one call.
+
+        The fields at consecutive registers are accessed together in a single
+        transaction. See debug_cap_ctrl_reg() for the registers.
+
+        Args:
+            fields : *(wwww) or *(wwwww)
+                (addr, offset, pos, bits) to read, or
+                (addr, offset, pos, bits, data) to write.
+        Returns:
+            values : *w
+                The values of the fields read. Empty for writes.
+        """
+        reg = self._debug_register_access(c, QSConstants.CNL_READ_VAL)
+        return self._debug_batch(reg, fields)
+
+    @setting(508, "DEBUG AWG REG Snapshot", regions=["*(www)"], returns=["*2w"])
+    def debug_awg_ctrl_reg_snapshot(self, c, regions=None):
+        """
+        Dump the AWG registers.
+
+        Args:
+            regions : *(www)
+                (addr, offset, number of registers) to dump. The master control
+                registers, and the control and wave parameter registers of all
+                the AWGs if not given.
+        Returns:
+            dump    : *2w
+                Rows of (addr, offset, value). Two dumps of the same regions
+                can be compared element-wise.
+        """
+        reg = self._debug_register_access(c, QSConstants.CNL_CTRL_VAL)
+        blocks = [(AwgMasterCtrlRegs, None)] + [
+            (_r, [_r.Addr.awg(_a) for _a in AWG.all()])
+            for _r in (AwgCtrlRegs, WaveParamRegs)
+        ]
+        return reg.snapshot(self._debug_registers(blocks, regions))
+
+    @setting(509, "DEBUG CAP REG Snapshot", regions=["*(www)"], returns=["*2w"])
+    def debug_cap_ctrl_reg_snapshot(self, c, regions=None):
+        """
+        Dump the capture registers.
+
+        Args:
+            regions : *(www)
+                (addr, offset, number of registers) to dump. The master control
+                registers, and the control and capture parameter registers of all
+                the capture units if not given.
+        Returns:
+            dump    : *2w
+                Rows of (addr, offset, value). Two dumps of the same regions
+                can be compared element-wise.
+        """
+        reg = self._debug_register_access(c, QSConstants.CNL_READ_VAL)
+        blocks = [(CaptureMasterCtrlRegs, None)] + [
+            (_r, [_r.Addr.capture(_u) for _u in CaptureUnit.all()])
+            for _r in (CaptureCtrlRegs, CaptureParamRegs)
+        ]
+        return reg.snapshot(self._debug_registers(blocks, regions))
+
+    def _debug_registers(self, blocks, regions):
+        """
+        Args:
+            blocks  : list of (regs_class, base addresses or None for regs_class.
+                      ADDR), used when regions is None.
+        """
+        if regions is None:
+            return [
+                _register
+                for regs_class, addrs in blocks
+                for _register in RegisterBulkAccess.register_map(regs_class, addrs)
+            ]
+        return [
+            (addr, offset + RegisterBulkAccess.REG_BYTES * _i)
+            for addr, offset, num_regs in regions
+            for _i in range(num_regs)
+        ]
@@ -1,10 +1,13 @@
 import sys
 import json
 import struct
+import time
+import concurrent
 
 from labrad import types as T
 from labrad.devices import DeviceWrapper, DeviceServer
 from labrad.server import setting
+from labrad.concurrent import future_to_deferred
 from twisted.internet.defer import inlineCallbacks, returnValue
 
 from quel_clock_master import (
@@ -70,6 +73,16 @@ class QuBE_Manager_Device(DeviceWrapper):
         resp = yield syn.read_clock()[1]
         returnValue(resp)
 
+    def read_timed_chassis_clock(self):
+        """
+        Read the chassis clock with the host time at the middle of the access.
+
+        It blocks and is intended to run on a thread pool.
+        """
+        started = time.monotonic()
+        clock = self._sync_ctrl.read_clock()[1]
+        return (started + time.monotonic()) / 2, clock
+
     @inlineCallbacks
     def set_microwave_switch(self, value):  # @inlineCallbacks
         g = self._lsi_ctrl.gpio
@@ -147,6 +160,14 @@ class QuBE_Manager_Server(DeviceServer):
         except Exception as e:
             print(sys._getframe().f_code.co_name, e)
 
+        try:
+            max_workers = QSConstants.THREAD_MAX_WORKERS
+            self._thread_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers
+            )  # for a threaded operation
+        except Exception as e:
+            print(sys._getframe().f_code.co_name, e)
+
     def extract_links(self, link):
         return [
             (
@@ -386,9 +407,14 @@ class QuBE_Manager_Server(DeviceServer):
         if not self.__is_clock_opened:
             raise Exception(QSMessage.ERR_DEV_NOT_OPEN)
 
+        resp = yield self._kick_clock_synch([target_addr])
+        returnValue(resp)
+
+    @inlineCallbacks
+    def _kick_clock_synch(self, target_addrs):  # @inlineCallbacks
         resp = False
         try:
-            ret, fromaddr = yield self._master_ctrl.kick_clock_synch([target_addr])
+            ret, fromaddr = yield self._master_ctrl.kick_clock_synch(target_addrs)
             if 16 <= len(ret):
                 (ret,) = struct.unpack("b", ret[:1])
             if 0 <= ret:
@@ -465,3 +491,104 @@ class QuBE_Manager_Server(DeviceServer):
 
         returnValue(resp)
 
+    @setting(308, "Group Synchronize", names=["*s"], returns=["*(sbv)"])
+    def group_synchronize(self, c, names=None):
+        """
+        Synchronize chassis to the master FPGA board at once and verify them.
+
+        The master board is kicked once with the addresses of all the chassis.
+        Then, the chassis clocks are read in parallel and compared with the
+        master clock. The offset is corrected for the difference of the reading
+        times. A chassis with the offset over QSConstants.SYNC_GROUP_TOL clocks
+        is synchronized again, up to QSConstants.SYNC_GROUP_RETRY times.
+
+        Args:
+            names : *s
+                Chassis names. All the chassis if not given.
+
+        Returns:
+            result : *(sbv)
+                List of (chassis name, success, offset in clocks).
+        """
+        if not self.__is_clock_opened:
+            raise Exception(QSMessage.ERR_DEV_NOT_OPEN)
+
+        if names is None:
+            devices = list(self.devices.values())
+        else:
+            devices = [self.getDevice(c, key=_n) for _n in names]
+
+        result = dict()
+        pending = devices
+        for _ in range(1 + QSConstants.SYNC_GROUP_RETRY):
+            kicked = yield self._kick_clock_synch(
+                [dev.ipaddr_synchronization for dev in pending]
+            )
+            if kicked:
+                offsets = yield self._clock_offsets(pending)
+            else:
+                offsets = {dev.name: None for dev in pending}
+
+            failed = list()
+            for dev in pending:
+                offset = offsets[dev.name]
+                success = (
+                    offset is not None and QSConstants.SYNC_GROUP_TOL >= abs(offset)
+                )
+                result[dev.name] = (success, float("nan") if offset is None else offset)
+                if not success:
+                    failed.append(dev)
+            if 1 > len(failed):
+                break
+            pending = failed
+
+        returnValue([(dev.name,) + result[dev.name] for dev in devices])
+
+    @inlineCallbacks
+    def _clock_offsets(self, devices):  # @inlineCallbacks
+        """
+        Read the master and chassis clocks in parallel.
+
+        Returns:
+            offsets : dict of the chassis name to the offset from the master clock
+                      in clocks, or None if the clock could not be read. All of
+                      them are None if the master clock could not be read.
+        """
+
+        def read_master_clock():
+            started = time.monotonic()
+            clock = self._master_ctrl.read_clock()[1]  # as the chassis clocks
+            return (started + time.monotonic()) / 2, clock
+
+        master = future_to_deferred(self._thread_pool.submit(read_master_clock))
+        chassis = [
+            future_to_deferred(self._thread_pool.submit(dev.read_timed_chassis_clock))
+            for dev in devices
+        ]
+        try:
+            master_time, master_clock = yield master
+        except Exception as e:
+            print(sys._getframe().f_code.co_name, "master", e)
+            master_clock = 0
+        if 0 == master_clock:
+            for twisted_deferred_obj in chassis:  # the reads are left to finish
+                twisted_deferred_obj.addErrback(lambda _failure: None)
+            returnValue({dev.name: None for dev in devices})
+
+        offsets = dict()
+        for dev, twisted_deferred_obj in zip(devices, chassis):
+            try:
+                host_time, clock = yield twisted_deferred_obj
+            except Exception as e:
+                print(sys._getframe().f_code.co_name, dev.name, e)
+                offsets[dev.name] = None
+                continue
+            if 0 == clock:
+                offsets[dev.name] = None
+                continue
+            offsets[dev.name] = float(
+                clock
+                - master_clock
+                - (host_time - master_time) * QSConstants.SYNC_CLOCK
+            )
+        returnValue(offsets)
@@ -5,7 +5,11 @@ import logging
 from datetime import datetime
 import re
 import os
+import threading
+import time
 from dataclasses import dataclass
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor
 
 from quel_ic_config import Quel1BoxIntrinsic, Quel1BoxType
 from quel_clock_master import SequencerClient
@@ -32,21 +36,97 @@ def convert_str_to_group_line_tuple(s):
         input_line_tuple = convert_str_to_int_str_tuple(s)
         return input_line_tuple
 
-class QubeBoxInfo:
+class QubeConfigStore:
+    """
+    Config files in config/, loaded and validated once per process.
+
+    A file is parsed again only when its mtime changes. The keys of
+    port_mapping.json are parsed into (group, line) tuples at load, and the
+    port mappers are memoized per box type.
+    """
     config_directory = Path(__file__).parent.joinpath("config").resolve()
-    box_info_filename = "box_info.json"
-
-    def __new__(cls, *args, **kargs):
-        if not hasattr(cls, "_instance"):
-            cls._instance = super(QubeBoxInfo, cls).__new__(cls)
-            with open(cls.config_directory.joinpath(cls.box_info_filename)) as info_file:
-                cls.box_info = json.load(info_file)
-        return cls._instance
-    
+    filenames = {
+        "box_info": "box_info.json",
+        "box_group": "box_group.json",
+        "port_mapping": "port_mapping.json",
+        "default_line_config": "default_line_config.json",
+    }
+    _lock = threading.RLock()
+    _files = {}  # name -> (mtime, data)
+    _mappers = {}  # box type -> (port mappings of the type, QubePortMapper)
+
+    @classmethod
+    def get(cls, name):
+        path = cls.config_directory.joinpath(cls.filenames[name])
+        mtime = os.stat(path).st_mtime_ns
+        with cls._lock:
+            cached = cls._files.get(name)
+            if cached is None or cached[0] != mtime:
+                with open(path) as config_file:
+                    data = getattr(cls, f"_validate_{name}")(json.load(config_file))
+                cached = cls._files[name] = (mtime, data)
+        return cached[1]
+
+    @classmethod
+    def port_mapper(cls, box_type):
+        mappings = cls.get("port_mapping")[box_type]
+        with cls._lock:
+            cached = cls._mappers.get(box_type)
+            if cached is None or cached[0] is not mappings:
+                cached = cls._mappers[box_type] = (mappings, QubePortMapper(box_type))
+        return cached[1]
+
+    @staticmethod
+    def _require(filename, entry, keys, where):
+        missing = [key for key in keys if key not in entry]
+        if missing:
+            raise ValueError(f"{filename}: {where} lacks {missing}")
+
+    @classmethod
+    def _validate_box_info(cls, box_info):
+        for device_id, info in box_info.items():
+            cls._require(cls.filenames["box_info"], info, ["ip", "type", "id"], device_id)
+        return box_info
+
+    @classmethod
+    def _validate_box_group(cls, box_group):
+        for group_id, group in box_group.items():
+            cls._require(cls.filenames["box_group"], group, ["devices", "master_ip"], group_id)
+        return box_group
+
+    @classmethod
+    def _validate_port_mapping(cls, port_mapping_by_type):
+        parsed = {}
+        for box_type, port_mapping in port_mapping_by_type.items():
+            forward = {}
+            for key, info in port_mapping.items():
+                group_line = convert_str_to_group_line_tuple(key)
+                if group_line is None:
+                    raise ValueError(f"{cls.filenames['port_mapping']}: {box_type} has an invalid line {key}")
+                cls._require(cls.filenames["port_mapping"], info, ["port", "role"], f"{box_type} {key}")
+                forward[group_line] = MappingProxyType(info)
+            reverse = {info["port"]: group_line for group_line, info in forward.items()}
+            # shared by all the port mappers of the type, hence read-only
+            parsed[box_type] = (MappingProxyType(forward), MappingProxyType(reverse))
+        return parsed
+
+    @classmethod
+    def _validate_default_line_config(cls, default_config):
+        fields = list(QubeLineConfig.__dataclass_fields__)
+        for device_id, config_by_role in default_config.items():
+            for role, config in config_by_role.items():
+                cls._require(cls.filenames["default_line_config"], config, fields, f"{device_id} {role}")
+        return default_config
+
+class QubeBoxInfo:
     @classmethod
     def _get_subsystem_ipaddr(cls, device_id, ss_ip_identifier, place_holder="*"):
-        return cls.box_info[device_id]['ip'].replace(place_holder, f"{ss_ip_identifier}")
+        return cls.box_info()[device_id]['ip'].replace(place_holder, f"{ss_ip_identifier}")
     
+    @classmethod
+    def box_info(cls):
+        return QubeConfigStore.get("box_info")
+
     @classmethod
     def get_ipaddr_wss(cls, device_id):
         return cls._get_subsystem_ipaddr(device_id, ss_ip_identifier=1)
@@ -61,36 +141,24 @@ class QubeBoxInfo:
     
     @classmethod
     def get_box_type_str(cls, device_id):
-        #print(f"cls.box_info[device_id]:{cls.box_info[device_id]}")
-        return cls.box_info[device_id]['type']        
+        return cls.box_info()[device_id]['type']        
     
     @classmethod
     def get_box_type(cls, device_id):
-        #print(f"cls.box_info[device_id]:{cls.box_info[device_id]}")
-        return Quel1BoxType.fromstr(cls.box_info[device_id]['type'])
+        return Quel1BoxType.fromstr(cls.box_info()[device_id]['type'])
     
     @classmethod
     def get_box_id(cls, device_id):
-        return cls.box_info[device_id]['id']
+        return cls.box_info()[device_id]['id']
     
     @classmethod
     def list_devices(cls):
-        return list(cls.box_info.keys())
+        return list(cls.box_info().keys())
 
 class QubeBoxGroup:
-    config_directory = Path(__file__).parent.joinpath("config").resolve()
-    box_group_filename = "box_group.json"
-
-    def __new__(cls, *args, **kargs):
-        self = super(QubeBoxGroup, cls).__new__(cls)
-        if not hasattr(cls, "box_group_all"):
-            with open(cls.config_directory.joinpath(cls.box_group_filename)) as group_file:
-                cls.box_group_all = json.load(group_file)
-        return self
-    
     def __init__(self, group_id):
         self.group_id = group_id
-        self.box_group = self.box_group_all[group_id]
+        self.box_group = QubeConfigStore.get("box_group")[group_id]
     
     def list_devices(self):
         return self.box_group["devices"]
@@ -100,22 +168,12 @@ class QubeBoxGroup:
     
     @classmethod
     def list_groups(cls):
-        return list(cls.box_group_all.keys())
+        return list(QubeConfigStore.get("box_group").keys())
 
 class QubePortMapper:
-    config_directory = Path(__file__).parent.joinpath("config").resolve()
-    port_mapping_filename = "port_mapping.json"
-
-    def __new__(cls, *args, **kargs):
-        self = super(QubePortMapper, cls).__new__(cls)
-        if not hasattr(cls, "port_mapping_by_type"):
-            with open(cls.config_directory.joinpath(cls.port_mapping_filename)) as port_file:
-                cls.port_mapping_by_type = json.load(port_file)
-        return self
- 
     def __init__(self, box_type):
-        self.port_mapping = {convert_str_to_group_line_tuple(k): v for (k, v) in self.port_mapping_by_type[box_type].items()}
-        self.reverse_mapping = {info['port']: (group, line) for (group, line), info in self.port_mapping.items()}
+        # pre-parsed, shared and read-only; use QubeConfigStore.port_mapper() for a memoized instance
+        self.port_mapping, self.reverse_mapping = QubeConfigStore.get("port_mapping")[box_type]
     
     def get_port(self, group, line):
         return self.port_mapping[(group, line)]['port']
@@ -156,22 +214,11 @@ class QubeBoxLineConfig:
         return self.config[(group, line)]
     
 class QubeDefaultConfigFactory:
-    config_directory = Path(__file__).parent.joinpath("config").resolve()
-    default_config_filename = "default_line_config.json"
-    
-    def __new__(cls, *args, **kargs):
-        if not hasattr(cls, "_instance"):
-            cls._instance = super(QubeDefaultConfigFactory, cls).__new__(cls)
-            with open(cls.config_directory.joinpath(cls.default_config_filename)) as config_file:
-                cls.default_config_by_roll = json.load(config_file)
-        return cls._instance
-    
     def create_config(self, device_id):
-        box_info = QubeBoxInfo()
-        box_type = box_info.get_box_type_str(device_id)
-        pmap = QubePortMapper(box_type)
+        box_type = QubeBoxInfo.get_box_type_str(device_id)
+        pmap = QubeConfigStore.port_mapper(box_type)
         box_line_config = QubeBoxLineConfig()
-        box_line_config.load_config_by_role(self.default_config_by_roll[device_id], pmap)
+        box_line_config.load_config_by_role(QubeConfigStore.get("default_line_config")[device_id], pmap)
         return box_line_config
 
 class LogWriter:
@@ -232,7 +279,7 @@ class QubeBoxSetupHelper:
 
     def _create_port_mapping(self, device_id):
         boxtype = self.box_info.get_box_type_str(device_id)
-        pmap = QubePortMapper(boxtype)
+        pmap = QubeConfigStore.port_mapper(boxtype)
         return pmap
 
     def _create_sequencer_client(self, device_id):
@@ -291,19 +338,43 @@ class QubeBoxSetupHelper:
 
         print(f"{self.device_id} linkup result: MxFE0: {linkup_ok[0]}, MxFE1: {linkup_ok[1]}")
 
-        for mxfe in mxfe_list:
-            status, err_flag = list(map(hex, self.box.css.get_link_status(mxfe)))
-            print(f"{self.device_id} MxFE{mxfe} link status: {status}, crc error: {err_flag}")
+        for mxfe, (status, err_flag) in enumerate(self.get_link_status()):
+            print(f"{self.device_id} MxFE{mxfe} link status: {hex(status)}, crc error: {hex(err_flag)}")
         return linkup_ok
 
-    def configure_lines(self, box_line_config):
+    def get_link_status(self, mxfe_list=(0, 1)):
+        return [tuple(self.box.css.get_link_status(mxfe)) for mxfe in mxfe_list]
+
+    def read_line_config(self, group, line):
+        css = self.box.css
+        sideband = css.get_sideband(group, line)
+        # vatt is not readable from the hardware. css keeps a copy of the last
+        # value written, which is None until it is written in this process.
+        vatt = css.get_vatt_carboncopy(group, line)
+        return QubeLineConfig(vatt=vatt, sideband=sideband)
+
+    def configure_lines(self, box_line_config, force=False):
+        """
+        Write the sideband and vatt of the lines which differ from box_line_config.
+
+        Returns the list of changes, (group, line, name, current value, new value).
+        The current vatt is None if it has not been written in this process, and
+        all the current values are None with force.
+        """
+        changes = []
         for group in self.box.css.get_all_groups():
             for line in self.box.css.get_all_lines_of_group(group):
                 line_config = box_line_config.get_line_config(group, line)
-                self.box.css.set_sideband(group, line, line_config.sideband)
-                self.box.css.set_vatt(group, line, line_config.vatt)
-
-    def initialize(self, box_line_config=None, save_linkup_data=True, save_log=True, logging_level=logging.INFO, ignore_access_failure_of_adrf6780={}):
+                current = QubeLineConfig(vatt=None, sideband=None) if force else self.read_line_config(group, line)
+                if current.sideband != line_config.sideband:
+                    self.box.css.set_sideband(group, line, line_config.sideband)
+                    changes.append((group, line, "sideband", current.sideband, line_config.sideband))
+                if current.vatt != line_config.vatt:
+                    self.box.css.set_vatt(group, line, line_config.vatt)
+                    changes.append((group, line, "vatt", current.vatt, line_config.vatt))
+        return changes
+
+    def initialize(self, box_line_config=None, save_linkup_data=True, save_log=True, logging_level=logging.INFO, ignore_access_failure_of_adrf6780={}, force=False):
         if box_line_config is None:
             default_config_factory = QubeDefaultConfigFactory()
             box_line_config = default_config_factory.create_config(self.device_id)
@@ -320,26 +391,109 @@ class QubeBoxSetupHelper:
             # else:
             #     print("Linkup failed. Skipped configuring lines.")
 
-            self.configure_lines(box_line_config)
-            self.open_all_lines()
+            changes = self.configure_lines(box_line_config, force=force)
+            for group, line, name, current, value in changes:
+                logging.info(f"{self.device_id} ({group}, {line}) {name}: {current} -> {value}")
+            opened = self.open_all_lines(force=force)
+            for group, line in opened:
+                logging.info(f"{self.device_id} ({group}, {line}) rfswitch: open")
+            print(f"{self.device_id}: {len(changes)} line settings changed, {len(opened)} rfswitches opened")
+        return changes, opened
 
     def get_awgs_of_port(self, port):
         group, line = self.port_mapper.resolve_line(port)
         awgs = self.rsource_mapper.get_awg_of_line(group, line)
         return awgs
 
-    def open_all_lines(self):
+    def open_all_lines(self, force=False):
+        """
+        Open the RF switches of all the lines which are not open yet.
+
+        Returns the list of (group, line) opened.
+        """
+        current = {} if force else self.box.dump_rfswitches()
+        opened = []
         for group in self.box.css.get_all_groups():
             for line in self.box.css.get_all_lines_of_group(group):
-                self.box.open_rfswitch(group, line)
+                if current.get((group, line)) != "pass":
+                    self.box.open_rfswitch(group, line)
+                    opened.append((group, line))
+        return opened
+
+def linkup_box(device_id, **kwargs):
+    # runs in a worker process. The MxFEs of a box are linked up one by one.
+    started = time.perf_counter()
+    try:
+        setup_helper = QubeBoxSetupHelper(device_id)
+        linkup_ok = setup_helper.linkup(**kwargs)
+        link_status = setup_helper.get_link_status()
+        error = None
+    except Exception as e:
+        linkup_ok, link_status, error = [], [], f"{type(e).__name__}: {e}"
+    return {
+        "linkup_ok": list(linkup_ok),
+        "link_status": [(hex(status), hex(err_flag)) for status, err_flag in link_status],
+        "error": error,
+        "elapsed": time.perf_counter() - started,
+    }
+
+def linkup_fleet(device_ids, max_workers=None, retry=2, **kwargs):
+    """
+    Link up boxes in parallel, one worker process per box.
+
+    The boxes which failed are linked up again up to retry times. kwargs are
+    passed to QubeBoxSetupHelper.linkup().
+
+    Returns a report of {device_id: result}. A result holds linkup_ok and
+    link_status (status, crc error) per MxFE, error, elapsed and attempts.
+    """
+    report = {}
+    pending = list(device_ids)
+    with ProcessPoolExecutor(max_workers=max_workers or len(pending) or None) as pool:
+        for attempt in range(1 + retry):
+            futures = {device_id: pool.submit(linkup_box, device_id, **kwargs) for device_id in pending}
+            for device_id, future in futures.items():
+                report[device_id] = dict(future.result(), attempts=attempt + 1)
+            pending = [device_id for device_id in pending if not is_linked_up(report[device_id])]
+            if not pending:
+                break
+    return report
+
+def is_linked_up(result):
+    return result["error"] is None and 0 < len(result["linkup_ok"]) and all(result["linkup_ok"])
+
+def print_linkup_report(report):
+    for device_id, result in report.items():
+        state = "OK" if is_linked_up(result) else "FAILED"
+        print(f"{device_id}: {state} ({result['attempts']} attempts, {result['elapsed']:.1f} s)")
+        for mxfe, (status, err_flag) in enumerate(result["link_status"]):
+            print(f"  MxFE{mxfe} linkup: {result['linkup_ok'][mxfe]}, link status: {status}, crc error: {err_flag}")
+        if result["error"] is not None:
+            print(f"  error: {result['error']}")
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument('target', type=str)
+    parser.add_argument('targets', type=str, nargs='*')
+    parser.add_argument('--group', type=str, default=None, help='the targets are the devices of the group in box_group.json')
+    parser.add_argument('--linkup', action='store_true', help='link up the targets in parallel before initialization')
+    parser.add_argument('--retry', type=int, default=2, help='retries of the linkup for the failed boxes')
+    parser.add_argument('--force', action='store_true', help='write all the line settings even if unchanged')
     from quel_ic_config_utils.common_arguments import add_common_workaround_arguments
     add_common_workaround_arguments(parser, use_ignore_access_failure_of_adrf6780=True)
     args = parser.parse_args()
-    
-    setup_helper = QubeBoxSetupHelper(args.target)
-    setup_helper.initialize(ignore_access_failure_of_adrf6780=args.ignore_access_failure_of_adrf6780)
+
+    targets = list(args.targets)
+    if args.group is not None:
+        targets.extend(QubeBoxGroup(args.group).list_devices())
+    if not targets:
+        parser.error("specify targets or --group")
+
+    if args.linkup:
+        report = linkup_fleet(targets, retry=args.retry, ignore_access_failure_of_adrf6780=args.ignore_access_failure_of_adrf6780)
+        print_linkup_report(report)
+        targets = [device_id for device_id in targets if is_linked_up(report[device_id])]
+
+    for target in targets:
+        setup_helper = QubeBoxSetupHelper(target)
+        setup_helper.initialize(ignore_access_failure_of_adrf6780=args.ignore_access_failure_of_adrf6780, force=args.force)
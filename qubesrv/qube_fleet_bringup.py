@@ -0,0 +1,258 @@
+"""
+Bring a fleet of QuBE boxes online.
+
+The stages below run as a dependency graph. Boxes proceed independently, so the
+lines of a box are configured as soon as the box is linked up.
+
+    linkup (per box) -> lines (per box) --.
+                                           +--> sync -> reload
+    register ------------------------------'
+
+- linkup   : QubeBoxSetupHelper.linkup() in a worker process per box.
+- lines    : QubeBoxSetupHelper.initialize(), i.e., line settings and rfswitches.
+- register : possible_links, chassis_skew and master_link in the LabRAD registry.
+- sync     : "Group Synchronize" of the QuBE Manager for the boxes ready. It
+             runs again whenever a box not synchronized yet becomes ready.
+- reload   : "Reload Links" of the QuBE Server, after every sync.
+
+The progress is saved to a checkpoint file after every stage. Running the same
+command again resumes from the stages not finished yet.
+
+    $ python qube_fleet_bringup.py qube001 qube002 --checkpoint rack1.json
+    $ python qube_fleet_bringup.py --group rack1 --possible-links possible_links.json
+"""
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from constants import QSConstants
+from qube_box_setup_helper import QubeBoxGroup, QubeBoxSetupHelper, is_linked_up, linkup_box
+
+BOX_STAGES = ["linkup", "lines"]
+FLEET_STAGES = ["register", "sync", "reload"]
+
+
+class Checkpoint:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.state = {"boxes": {}, "fleet": {}}
+        if filepath and os.path.exists(filepath):
+            with open(filepath) as f:
+                self.state = json.load(f)
+
+    def box(self, device_id):
+        return self.state["boxes"].setdefault(device_id, {})
+
+    def is_done(self, stage, device_id=None):
+        entry = self.box(device_id) if device_id else self.state["fleet"]
+        return entry.get(stage, {}).get("done", False)
+
+    def record(self, stage, done, elapsed, device_id=None, **detail):
+        entry = self.box(device_id) if device_id else self.state["fleet"]
+        entry[stage] = dict(detail, done=done, elapsed=elapsed)
+        self.save()
+
+    def save(self):
+        if not self.filepath:
+            return
+        tmp = self.filepath + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.filepath)  # never leave a broken checkpoint
+
+
+def _configure_box(device_id, force=False, **kwargs):
+    # runs in a worker process
+    started = time.perf_counter()
+    try:
+        changes, opened = QubeBoxSetupHelper(device_id).initialize(force=force, **kwargs)
+        return {"changes": len(changes), "opened": len(opened), "error": None, "elapsed": time.perf_counter() - started}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "elapsed": time.perf_counter() - started}
+
+
+def register_links(possible_links, chassis_skew=None, master_link=None):
+    import labrad
+
+    cxn = labrad.connect()
+    reg = cxn.registry
+    reg.cd(QSConstants.REGDIR, True)
+    with open(possible_links, encoding="utf-8") as f:
+        reg.set(QSConstants.REGLNK, json.dumps(json.load(f)))
+    if chassis_skew is not None:
+        with open(chassis_skew, encoding="utf-8") as f:
+            reg.set(QSConstants.REGSKEW, json.dumps(json.load(f)))
+    if master_link is not None:
+        reg.set(QSConstants.REGMASTERLNK, master_link)
+
+
+def synchronize_boxes(device_ids):
+    import labrad
+
+    cxn = labrad.connect()
+    manager = cxn[QSConstants.MNRNAME]
+    manager.refresh_devices()
+    return [tuple(_r) for _r in manager.group_synchronize(device_ids)]
+
+
+def reload_server():
+    import labrad
+
+    cxn = labrad.connect()
+    added, removed, updated = cxn[QSConstants.SRVNAME].reload_links()
+    return {"added": list(added), "removed": list(removed), "updated": list(updated)}
+
+
+def bringup_fleet(device_ids, checkpoint, max_workers=None, retry=2, force=False, register=None, skip_server=False, **linkup_kwargs):
+    """
+    Run the bring-up stages and return the list of the boxes ready.
+
+    Args:
+        device_ids   : the boxes to bring up.
+        checkpoint   : Checkpoint. The finished stages are skipped.
+        max_workers  : the number of worker processes. One per box if None.
+        retry        : retries of a failed linkup of a box.
+        force        : write all the line settings even if unchanged.
+        register     : dict of the arguments of register_links(). The register
+                       stage is skipped if None.
+        skip_server  : skip the sync and reload stages which need LabRAD.
+    """
+    attempts = {device_id: 0 for device_id in device_ids}
+    ready = [device_id for device_id in device_ids if checkpoint.is_done("lines", device_id)]
+
+    with ProcessPoolExecutor(max_workers=max_workers or len(device_ids) or None) as pool:
+        running = {}
+
+        def submit(device_id):
+            if not checkpoint.is_done("linkup", device_id):
+                attempts[device_id] += 1
+                running[pool.submit(linkup_box, device_id, **linkup_kwargs)] = ("linkup", device_id)
+            elif not checkpoint.is_done("lines", device_id):
+                workaround = {k: v for k, v in linkup_kwargs.items() if "ignore_access_failure_of_adrf6780" == k}
+                running[pool.submit(_configure_box, device_id, force=force, **workaround)] = ("lines", device_id)
+
+        for device_id in device_ids:
+            submit(device_id)
+
+        if register is not None and not checkpoint.is_done("register"):
+            started = time.perf_counter()
+            try:
+                register_links(**register)  # runs while the boxes are linked up
+                checkpoint.record("register", True, time.perf_counter() - started)
+            except Exception as e:
+                checkpoint.record("register", False, time.perf_counter() - started, error=str(e))
+
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, device_id = running.pop(future)
+                result = future.result()
+                if "linkup" == stage:
+                    done = is_linked_up(result)
+                    checkpoint.record(
+                        stage,
+                        done,
+                        result["elapsed"],
+                        device_id,
+                        linkup_ok=result["linkup_ok"],
+                        link_status=result["link_status"],
+                        error=result["error"],
+                        attempts=attempts[device_id],
+                    )
+                    if done or attempts[device_id] <= retry:
+                        submit(device_id)
+                else:
+                    done = result["error"] is None
+                    checkpoint.record(stage, done, result["elapsed"], device_id, **{k: v for k, v in result.items() if "elapsed" != k})
+                    if done:
+                        ready.append(device_id)
+
+    if skip_server:
+        return ready
+
+    synced = checkpoint.state["fleet"].get("sync", {}).get("device_ids", [])
+    resynced = False
+    if not set(ready) <= set(synced):  # boxes recovered on this run join the group
+        started = time.perf_counter()
+        try:
+            result = synchronize_boxes(ready)
+            resynced = all(_r[1] for _r in result)
+            checkpoint.record(
+                "sync",
+                resynced,
+                time.perf_counter() - started,
+                result=result,
+                device_ids=ready if resynced else synced,
+            )
+        except Exception as e:
+            checkpoint.record("sync", False, time.perf_counter() - started, error=str(e), device_ids=synced)
+
+    if checkpoint.is_done("sync") and (resynced or not checkpoint.is_done("reload")):
+        started = time.perf_counter()
+        try:
+            checkpoint.record("reload", True, time.perf_counter() - started, **reload_server())
+        except Exception as e:
+            checkpoint.record("reload", False, time.perf_counter() - started, error=str(e))
+
+    return ready
+
+
+def print_timing(checkpoint, wall_time):
+    print(f"{'stage':10s} {'done':>6s} {'failed':>6s} {'max [s]':>9s} {'sum [s]':>9s}")
+    for stage in BOX_STAGES:
+        entries = [box[stage] for box in checkpoint.state["boxes"].values() if stage in box]
+        elapsed = [entry["elapsed"] for entry in entries]
+        done = sum(entry["done"] for entry in entries)
+        print(f"{stage:10s} {done:6d} {len(entries) - done:6d} {max(elapsed, default=0):9.1f} {sum(elapsed):9.1f}")
+    for stage in FLEET_STAGES:
+        entry = checkpoint.state["fleet"].get(stage)
+        if entry is not None:
+            print(f"{stage:10s} {int(entry['done']):6d} {int(not entry['done']):6d} {entry['elapsed']:9.1f} {entry['elapsed']:9.1f}")
+    print(f"wall time: {wall_time:.1f} s")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument('targets', type=str, nargs='*')
+    parser.add_argument('--group', type=str, default=None, help='the targets are the devices of the group in box_group.json')
+    parser.add_argument('--checkpoint', type=str, default="bringup_checkpoint.json", help='progress file to resume from')
+    parser.add_argument('--retry', type=int, default=2, help='retries of the linkup for the failed boxes')
+    parser.add_argument('--max-workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='write all the line settings even if unchanged')
+    parser.add_argument('--possible-links', type=str, default=None, help='possible_links.json to register')
+    parser.add_argument('--chassis-skew', type=str, default=None, help='chassis_skew.json to register')
+    parser.add_argument('--master-link', type=str, default=None, help='address of the master FPGA board to register')
+    parser.add_argument('--skip-server', action='store_true', help='do not synchronize clocks nor reload the server')
+    from quel_ic_config_utils.common_arguments import add_common_workaround_arguments
+    add_common_workaround_arguments(parser, use_ignore_access_failure_of_adrf6780=True)
+    args = parser.parse_args()
+
+    targets = list(args.targets)
+    if args.group is not None:
+        targets.extend(QubeBoxGroup(args.group).list_devices())
+        if args.master_link is None:
+            args.master_link = QubeBoxGroup(args.group).get_master_ip()
+    if not targets:
+        parser.error("specify targets or --group")
+
+    register = None
+    if args.possible_links is not None:
+        register = dict(possible_links=args.possible_links, chassis_skew=args.chassis_skew, master_link=args.master_link)
+
+    started = time.perf_counter()
+    checkpoint = Checkpoint(args.checkpoint)
+    ready = bringup_fleet(
+        targets,
+        checkpoint,
+        max_workers=args.max_workers,
+        retry=args.retry,
+        force=args.force,
+        register=register,
+        skip_server=args.skip_server,
+        ignore_access_failure_of_adrf6780=args.ignore_access_failure_of_adrf6780,
+    )
+    print_timing(checkpoint, time.perf_counter() - started)
+    print(f"ready: {ready}")
+    print(f"not ready: {[device_id for device_id in targets if device_id not in ready]}")
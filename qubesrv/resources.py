@@ -0,0 +1,141 @@
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Optional, Tuple
+
+from e7awgsw import CaptureModule
+from quel_ic_config.e7resource_mapper import Quel1E7ResourceMapper
+
+from constants import QSConstants
+from qube_box_setup_helper import QubeConfigStore
+
+############################################################
+#
+# RESOURCE INDEX
+#
+# Device names are resolved to the hardware resources once per chassis at
+# discovery. The index is immutable afterwards.
+#
+QUBE_DEVICE_ID = re.compile(r"(qube[0-9]{3})-(control|readout|pump)_([0-9a-d]{1,2})")
+
+
+def parse_qube_device_id(device_id):
+    m = QUBE_DEVICE_ID.match(device_id)
+    if m is None:
+        raise ValueError(f"Cannot parse device_id: {device_id}")
+    return m.group(1), m.group(2), m.group(3)
+
+
+@dataclass(frozen=True)
+class QubeResource:
+    name: str
+    port_type: str  # control, readout or pump
+    group: int
+    line: int
+    rline: Optional[str]  # None if the device has no adc
+    awg_ids: Tuple[int, ...]
+    cap_mod_id: Optional[int] = None
+    capture_units: Tuple[int, ...] = ()
+
+
+class QubeResourceIndex:
+    """
+    Resources of the devices of a chassis.
+
+    It maps a device name to the group, line, rline, AWG ids, capture module and
+    capture units, and holds the sets of the AWGs, capture modules and capture
+    units in use.
+    """
+
+    __slots__ = ("_chassis", "_resources", "_awg_ids", "_cap_mod_ids", "_cap_units")
+
+    def __init__(self, chassis, resources):
+        self._chassis = chassis
+        self._resources = MappingProxyType({_r.name: _r for _r in resources})
+        self._awg_ids = tuple(sorted({_i for _r in resources for _i in _r.awg_ids}))
+        self._cap_mod_ids = tuple(
+            sorted({_r.cap_mod_id for _r in resources if _r.cap_mod_id is not None})
+        )
+        self._cap_units = tuple(
+            sorted({_u for _r in resources for _u in _r.capture_units})
+        )
+
+    @classmethod
+    def build(cls, chassis, channels, box, box_type_str):
+        """
+        Build the index from the channels in possible_links.
+
+        Args:
+            chassis      : str. The chassis name, e.g. qube001.
+            channels     : list of the channel dictionaries in possible_links.
+            box          : quel_ic_config.Quel1Box
+            box_type_str : str. The box type in box_info.json.
+        """
+        pmaper = QubeConfigStore.port_mapper(box_type_str)
+        rmap = Quel1E7ResourceMapper(box.css, box.wss)
+
+        def resolve(port_string, is_target_line):
+            for c in port_string:  # the first port of the target direction
+                group, line = pmaper.resolve_line(int(c, 16))
+                if is_target_line(group, line):
+                    break
+            return group, line
+
+        resources = list()
+        for channel in channels:
+            channel_type = channel[QSConstants.CNL_TYPE_TAG]
+            if channel_type not in [QSConstants.CNL_CTRL_VAL, QSConstants.CNL_READ_VAL]:
+                continue
+            name = chassis + "-" + channel[QSConstants.CNL_NAME_TAG]
+            _, port_type, port_string = parse_qube_device_id(name)
+
+            if "readout" == port_type:
+                group, line = resolve(port_string, box._dev.is_output_line)
+                _, rline = resolve(port_string, box._dev.is_input_line)
+            else:
+                group, line = pmaper.resolve_line(int(port_string, 16))
+                rline = None
+
+            awg_ids = tuple(
+                rmap.get_awg_of_channel(group, line, _i)
+                for _i in range(len(box.css._get_channels_of_line(group, line)))
+            )
+            kw = dict()
+            if QSConstants.CNL_READ_VAL == channel_type:
+                cap_mod_id = rmap.get_capture_module_of_rline(group, rline)
+                kw = dict(
+                    cap_mod_id=cap_mod_id,
+                    capture_units=tuple(CaptureModule.get_units(cap_mod_id)),
+                )
+            resources.append(
+                QubeResource(name, port_type, group, line, rline, awg_ids, **kw)
+            )
+        return cls(chassis, resources)
+
+    @property
+    def chassis_name(self):  # @property
+        return self._chassis
+
+    @property
+    def awg_ids(self):  # @property
+        return self._awg_ids
+
+    @property
+    def capture_module_ids(self):  # @property
+        return self._cap_mod_ids
+
+    @property
+    def capture_units(self):  # @property
+        return self._cap_units
+
+    def __getitem__(self, name):
+        return self._resources[name]
+
+    def __contains__(self, name):
+        return name in self._resources
+
+    def __iter__(self):
+        return iter(self._resources.values())
+
+    def __len__(self):
+        return len(self._resources)
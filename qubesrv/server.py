@@ -1,7 +1,9 @@
 import sys
 import json
 import concurrent
-import re
+import copy
+import time
+import threading
 
 import numpy as np
 
@@ -10,12 +12,11 @@ from labrad.devices import DeviceServer
 from labrad.server import setting
 from labrad.units import Value
 from labrad.concurrent import future_to_deferred
-from twisted.internet.defer import inlineCallbacks, returnValue
+from twisted.internet.defer import inlineCallbacks, returnValue, succeed
+from twisted.internet.task import LoopingCall
 
 from e7awgsw import (
     AwgCtrl,
-    AWG,
-    CaptureModule,
 )
 from quel_clock_master import (
     QuBEMasterClient,
@@ -23,13 +24,20 @@ from quel_clock_master import (
 )  # for multi-sync operation
 
 from quel_ic_config import Quel1Box, Quel1BoxType
-from quel_ic_config.e7resource_mapper import Quel1E7ResourceMapper
 
 from constants import QSConstants, QSMessage
-from devices import QuBE_ReadoutLine, QuBE_ControlLine
-from utils import pingger, QuBECaptureCtrl
+import dsp
+from devices import QuBE_ReadoutLine, QuBE_ControlLine, QuBECaptureCtrl
+from utils import (
+    pingger,
+    SequencerLatencyMonitor,
+    ChassisClockTracker,
+    save_snapshot,
+    load_snapshot,
+)
 
-from qube_box_setup_helper import QubeBoxInfo, QubePortMapper
+from qube_box_setup_helper import QubeBoxInfo
+from resources import QubeResourceIndex
 
 
 ############################################################
@@ -47,6 +55,12 @@ class QuBE_Server(DeviceServer):
 
     @inlineCallbacks
     def initServer(self):  # @inlineCallbacks
+        self._chassis_cache = dict()  # chassis name -> (link info, device tuples)
+        self._chassis_ready = dict()  # chassis name -> future of lazy initialization
+        self._chassis_resources = dict()  # chassis name -> (awg_ctrl, cap_ctrl,
+        #                                     QubeResourceIndex)
+        self._lazy_init = False
+        self._clock_tracking = None
         yield DeviceServer.initServer(self)
 
         cxn = self.client
@@ -58,17 +72,34 @@ class QuBE_Server(DeviceServer):
             skew = yield reg.get(QSConstants.REGSKEW)
             self.chassisSkew = json.loads(skew)
             self._sync_ctrl = dict()
+            self._sync_latency = SequencerLatencyMonitor()
+            self._clock_tracker = ChassisClockTracker()
+            self._sync_locks = dict()  # chassis name -> lock of its SequencerClient
             self.box_info = QubeBoxInfo()
+            self._clock_tracking = LoopingCall(self._sample_chassis_clocks)
         except Exception as e:
             print(sys._getframe().f_code.co_name, e)
 
+        try:
+            lazy = yield reg.get(QSConstants.REGLAZY)
+            self._lazy_init = bool(json.loads(lazy))
+        except Exception:
+            pass  # optional key; chassis are initialized at discovery
+
         try:
             max_workers = QSConstants.THREAD_MAX_WORKERS
             self._thread_pool = concurrent.futures.ThreadPoolExecutor(
                 max_workers=max_workers
             )  # for a threaded operation
+            self._clock_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1
+            )  # for the clock sampling
         except Exception as e:
             print(sys._getframe().f_code.co_name, e)
+            self._clock_tracking = None
+
+        if self._clock_tracking is not None:
+            self._clock_tracking.start(QSConstants.CLK_TRACK_IVL, now=False)
 
     def initContext(self, c):
         DeviceServer.initContext(self, c)
@@ -76,6 +107,10 @@ class QuBE_Server(DeviceServer):
         c[QSConstants.ACQ_CNXT_TAG] = dict()
         c[QSConstants.DAQ_TOUT_TAG] = QSConstants.DAQ_INITTOUT
         c[QSConstants.DAQ_SDLY_TAG] = QSConstants.DAQ_INITSDLY
+        c[QSConstants.DAQ_PIPE_TAG] = False
+        c[QSConstants.DAQ_STAGE_TAG] = dict()
+        c[QSConstants.DAQ_TRAIN_TAG] = list()
+        c[QSConstants.DAQ_ASDLY_TAG] = (False, QSConstants.DAQ_SDLY_MARGIN)
 
     def chooseDeviceWrapper(self, *args, **kw):
         tag = (
@@ -129,45 +164,6 @@ class QuBE_Server(DeviceServer):
     # | 12 | 6 | 1 | 2, 2, 4 | (0, m, 2)              | 0  | 2 |
     # | 12 | 6 | 1 | 2, 2, 4 | (0, m, 3)              | 0  | 3 |
 
-    # # TODO: PossibleLinksで登録するようになったらこれも不要
-    def get_dac_group_line_from_name(self, box, pmaper, name):
-        _, role, port_string = self.parse_qube_device_id(name)
-        if role == "readout":
-            for c in port_string:
-                port = int(c, 16)
-                group, line = pmaper.resolve_line(port)
-                if box._dev.is_output_line(group, line):  # select the output line
-                    break
-        else:
-            port = int(port_string, 16)
-            group, line = pmaper.resolve_line(port)
-        return group, line
-
-    def get_adc_group_line_from_name(self, box, pmaper, name):
-        _, role, port_string = self.parse_qube_device_id(name)
-        if role == "readout":
-            for c in port_string:
-                port = int(c, 16)
-                group, line = pmaper.resolve_line(port)
-                if box._dev.is_input_line(group, line):  # select the input line
-                    break
-        else:
-            raise Exception("Only readout line has adc.")
-        return group, line
-
-    def parse_qube_device_id(self, device_id):
-        devicd_id_regexp = re.compile(
-            r"(qube[0-9]{3})-(control|readout|pump)_([0-9a-d]{1,2})"
-        )
-        m = devicd_id_regexp.match(device_id)
-        if m:
-            device_name = m.group(1)
-            port_type = m.group(2)
-            port_string = m.group(3)
-        else:
-            raise ValueError(f"Cannot parse device_id: {device_id}")
-        return device_name, port_type, port_string
-
     def instantiateChannel(self, name, channels, awg_ctrl, cap_ctrl, info):
         box_type = self.box_info.get_box_type(name)
         box_type_str = self.box_info.get_box_type_str(name)
@@ -179,79 +175,36 @@ class QuBE_Server(DeviceServer):
             boxtype=box_type,
         )
         # box.reconnect()
-        rmap = Quel1E7ResourceMapper(box.css, box.wss)
+        # TODO: rline type:B の場合は、rline = "m" にする？ そうでもないらしい。
+        index = QubeResourceIndex.build(name, channels, box, box_type_str)
 
-        def gen_awg(name, role, chassis, channel, awg_ctrl, cap_ctrl):
-            pmaper = QubePortMapper(box_type_str)
-            group, line = self.get_dac_group_line_from_name(box, pmaper, name)
-            # TODO: rline type:B の場合は、rline = "m" にする？ そうでもないらしい。
-            try:
-                group, rline = self.get_adc_group_line_from_name(box, pmaper, name)
-            except:
-                rline = None
-            awg_ch_ids = []
-            chs = box.css._get_channels_of_line(group, line)
-            for i in range(len(chs)):
-                awg_idx = rmap.get_awg_of_channel(group, line, i)
-                awg_ch_ids.append(awg_idx)
-
-            args = name, role
+        devices = []
+        for resource in index:
+            role = (
+                QSConstants.CNL_CTRL_VAL
+                if resource.cap_mod_id is None
+                else QSConstants.CNL_READ_VAL
+            )
             kw = dict(
                 awg_ctrl=awg_ctrl,
-                awg_ch_ids=awg_ch_ids,
-                chassis=chassis,
+                awg_ch_ids=list(resource.awg_ids),
+                chassis=name,
                 ipfpga=ipfpga,
                 iplsi=iplsi,
                 ipsync=ipsync,
                 device_type=box_type,
-                group=group,
-                line=line,
-                rline=rline,
-            )
-
-            return (name, args, kw)
-
-        def gen_mux(name, role, chassis, channel, awg_ctrl, cap_ctrl):
-            _name, _args, _kw = gen_awg(
-                name, role, chassis, channel, awg_ctrl, cap_ctrl
-            )
-
-            pmaper = QubePortMapper(box_type_str)
-            # TODO: rline type:B の場合は、rline = "m" にする？ そうでもないらしい。
-            group, rline = self.get_adc_group_line_from_name(box, pmaper, name)
-            cap_mod_id = rmap.get_capture_module_of_rline(group, rline)
-            capture_units = CaptureModule.get_units(cap_mod_id)
-
-            kw = dict(
-                cap_ctrl=cap_ctrl,
-                capture_units=capture_units,
-                cap_mod_id=cap_mod_id,
+                group=resource.group,
+                line=resource.line,
+                rline=resource.rline,
             )
-            _kw.update(kw)
-            return (_name, _args, _kw)
-
-        devices = []
-        for channel in channels:
-            channel_type = channel[QSConstants.CNL_TYPE_TAG]
-            channel_name = name + "-" + channel[QSConstants.CNL_NAME_TAG]
-            args = (
-                channel_name,
-                channel_type,
-                name,
-                channel,
-                awg_ctrl,
-                cap_ctrl,
-            )
-            to_be_added = (
-                gen_awg(*args)
-                if channel_type == QSConstants.CNL_CTRL_VAL
-                else (
-                    gen_mux(*args) if channel_type == QSConstants.CNL_READ_VAL else None
+            if QSConstants.CNL_READ_VAL == role:
+                kw.update(
+                    cap_ctrl=cap_ctrl,
+                    capture_units=list(resource.capture_units),
+                    cap_mod_id=resource.cap_mod_id,
                 )
-            )
-            if to_be_added is not None:
-                devices.append(to_be_added)
-        return devices
+            devices.append((resource.name, (resource.name, role), kw))
+        return index, devices
 
     def instantiateQube(self, name, info):
         try:
@@ -264,52 +217,289 @@ class QuBE_Server(DeviceServer):
         try:
             awg_ctrl = AwgCtrl(ipfpga)  # AWG CONTROL (e7awgsw)
             cap_ctrl = QuBECaptureCtrl(ipfpga)  # CAP CONTROL (inherited from e7awgsw)
-            awg_ctrl.initialize(*AWG.all())
-            cap_ctrl.initialize(*CaptureModule.all())
         except Exception as e:
             print(sys._getframe().f_code.co_name, e)
             return list()
 
         try:
-            devices = self.instantiateChannel(name, channels, awg_ctrl, cap_ctrl, info)
+            index, devices = self.instantiateChannel(
+                name, channels, awg_ctrl, cap_ctrl, info
+            )
         except Exception as e:
             print("Exception!!! instantiateChannel")
             print(sys._getframe().f_code.co_name, e)
-            devices = list()
+            return list()
+
+        self._chassis_resources[name] = (awg_ctrl, cap_ctrl, index)
+        try:
+            self.initializeResources(name)
+        except Exception as e:
+            print(sys._getframe().f_code.co_name, e)
+            return list()
         return devices
 
+    def initializeResources(self, name):
+        """
+        Initialize the AWGs and capture units used by the devices of a chassis.
+
+        The resources that possible_links does not expose are left untouched.
+        """
+        awg_ctrl, cap_ctrl, index = self._chassis_resources[name]
+        if 0 < len(index.awg_ids):
+            awg_ctrl.initialize(*index.awg_ids)
+        if 0 < len(index.capture_units):
+            cap_ctrl.initialize(*index.capture_units)
+
+    def probeQube(self, name, info):
+        """
+        Check the reachability of a chassis and instantiate it.
+
+        It runs on the thread pool so that chassis are brought up in parallel.
+
+        Returns:
+            devices : list of (name, args, kw), or None if not reachable.
+        """
+        print(QSMessage.CHECKING_QUBEUNIT.format(name))
+        try:
+            res = pingger(info[QSConstants.SRV_IPFPGA_TAG])
+            if 0 == res:
+                res = pingger(info[QSConstants.SRV_IPLSI_TAG])
+            if 0 != res:
+                res = pingger(info[QSConstants.SRV_IPCLK_TAG])
+            if 0 != res:
+                raise Exception(QSMessage.ERR_HOST_NOTFOUND.format(name))
+        except Exception as e:
+            print(sys._getframe().f_code.co_name, e)
+            return None
+
+        print(QSMessage.CNCTABLE_QUBEUNIT.format(name))
+        return self.instantiateQube(name, info)
+
+    def registerQube(self, name, info):
+        """
+        List the devices of a chassis without accessing the hardware.
+
+        It is used in lazy mode. The chassis is initialized by connectQube() when
+        one of the devices is selected for the first time.
+
+        Returns:
+            devices : list of (name, args, kw).
+        """
+        devices = []
+        for channel in info[QSConstants.SRV_CHANNEL_TAG]:
+            channel_type = channel[QSConstants.CNL_TYPE_TAG]
+            if channel_type not in [QSConstants.CNL_CTRL_VAL, QSConstants.CNL_READ_VAL]:
+                continue
+            channel_name = name + "-" + channel[QSConstants.CNL_NAME_TAG]
+            args = channel_name, channel_type
+            devices.append((channel_name, args, dict(chassis=name, lazy=True)))
+        return devices
+
+    def connectQube(self, name):
+        """
+        Initialize a chassis registered in lazy mode and connect its devices.
+
+        It runs on the thread pool.
+        """
+        try:
+            devices = self.instantiateQube(name, self.possibleLinks[name])
+            if 1 > len(devices):
+                raise Exception(QSMessage.ERR_HOST_NOTFOUND.format(name))
+            for device_name, args, kw in devices:
+                if device_name in self.devices:
+                    self.devices[device_name].connect(*args, **kw)
+        except Exception:
+            self._chassis_ready.pop(name, None)  # to retry on the next use
+            raise
+        return True
+
+    def _ensure_chassis(self, chassis_name):
+        """
+        Make sure that a chassis is initialized.
+
+        In lazy mode, the first call starts the initialization on the thread pool
+        and the concurrent callers wait for the same initialization.
+
+        Returns:
+            deferred : fires when the chassis is ready.
+        """
+        if not self._lazy_init:
+            return succeed(True)
+        future = self._chassis_ready.get(chassis_name)
+        if future is None:
+            future = self._thread_pool.submit(self.connectQube, chassis_name)
+            self._chassis_ready[chassis_name] = future
+        return future_to_deferred(future)
+
     @inlineCallbacks
     def findDevices(self):  # @inlineCallbacks
-        cxn = self.client
+        """
+        Find the devices of the chassis in possibleLinks.
+
+        A chassis instantiated before with the same link information is reused as
+        it is. The other chassis are instantiated in parallel on the thread pool.
+        """
         found = []
 
-        for name in self.possibleLinks.keys():
-            print(QSMessage.CHECKING_QUBEUNIT.format(name))
-            try:
-                res = pingger(self.possibleLinks[name][QSConstants.SRV_IPFPGA_TAG])
-                if 0 == res:
-                    res = pingger(self.possibleLinks[name][QSConstants.SRV_IPLSI_TAG])
-                if 0 != res:
-                    res = pingger(self.possibleLinks[name][QSConstants.SRV_IPCLK_TAG])
-                if 0 != res:
-                    raise Exception(QSMessage.ERR_HOST_NOTFOUND.format(name))
-            except Exception as e:
-                print(sys._getframe().f_code.co_name, e)
+        deferred_objs = dict()
+        for name, info in self.possibleLinks.items():
+            cached = self._chassis_cache.get(name)
+            if cached is not None and cached[0] == info:
+                found.extend(cached[1])
                 continue
+            concurrent_deferred_obj = self._thread_pool.submit(
+                self.registerQube if self._lazy_init else self.probeQube, name, info
+            )
+            deferred_objs[name] = future_to_deferred(concurrent_deferred_obj)
 
-            print(QSMessage.CNCTABLE_QUBEUNIT.format(name))
-            devices = self.instantiateQube(name, self.possibleLinks[name])
+        for name, twisted_deferred_obj in deferred_objs.items():
+            devices = yield twisted_deferred_obj
+            self._chassis_cache.pop(name, None)
+            self._chassis_ready.pop(name, None)
+            if not devices:
+                continue
+            info = self.possibleLinks[name]
+            self._chassis_cache[name] = (copy.deepcopy(info), devices)
             found.extend(devices)
 
             sync_ctrl = SequencerClient(
-                self.possibleLinks[name][QSConstants.SRV_IPCLK_TAG],
+                info[QSConstants.SRV_IPCLK_TAG],
                 receiver_limit_by_bind=True,
             )
             self._sync_ctrl.update({name: sync_ctrl})
-            yield
-            # print(sys._getframe().f_code.co_name,found)
+            self._clock_tracker.discard(name)
+
+        for name in list(self._chassis_cache.keys()):
+            if name not in self.possibleLinks:
+                del self._chassis_cache[name]
+                self._chassis_ready.pop(name, None)
+                self._chassis_resources.pop(name, None)
+                self._sync_ctrl.pop(name, None)
+                self._clock_tracker.discard(name)
         returnValue(found)
 
+    def _read_chassis_clock(self, chassis_name):
+        """
+        Read a chassis clock and feed the value to the clock tracker.
+
+        The sample is timestamped at the middle of the round trip.
+        """
+        with self._sync_lock(chassis_name):
+            started = time.perf_counter()
+            host_time = time.monotonic()
+            clock = self._sync_ctrl[chassis_name].read_clock()[1]
+            latency = time.perf_counter() - started
+            self._sync_latency.record(
+                chassis_name, SequencerLatencyMonitor.READ, latency
+            )
+            self._clock_tracker.add_sample(
+                chassis_name, host_time + latency / 2, clock
+            )
+        return clock
+
+    def _sample_chassis_clocks(self):
+        """
+        Periodically sample the chassis clocks for the clock tracker.
+
+        The clocks are read in the single worker of the clock pool, off the
+        reactor. The next tick waits until the returned deferred fires. The lock
+        of each chassis keeps its reads from interleaving with the other
+        accesses to its sequencer, so that a slow chassis only delays the
+        starts that involve it.
+        """
+        chassis_list = list(self._sync_ctrl.keys())
+        concurrent_deferred_obj = self._clock_pool.submit(
+            self._read_chassis_clocks, chassis_list
+        )
+        return future_to_deferred(concurrent_deferred_obj)
+
+    def _read_chassis_clocks(self, chassis_list):
+        for chassis_name in chassis_list:
+            try:
+                self._read_chassis_clock(chassis_name)
+            except Exception as e:
+                print(sys._getframe().f_code.co_name, chassis_name, e)
+
+    @setting(
+        2,
+        "Select Device",
+        key=[
+            ": Select first device",
+            "s: Select device by name",
+            "w: Select device by ID",
+        ],
+        returns=["s: Name of the selected device"],
+    )
+    def select_device(self, c, key=0):
+        """
+        Select a device for the current context.
+
+        In lazy mode, the chassis of the device is initialized on first selection.
+        """
+        dev = self.selectDevice(c, key=key)
+        yield self._ensure_chassis(dev.chassis_name)
+        returnValue(dev.name)
+
+    @setting(14, "Warm Up", names=["*s"], returns=["*s"])
+    def warm_up(self, c, names):
+        """
+        Initialize the chassis of the given devices in parallel.
+
+        In lazy mode, it avoids the initialization delay on the first selection.
+        Nothing is done otherwise.
+
+        Args:
+            names : *s
+                Device names.
+
+        Returns:
+            chassis : *s
+                The names of the chassis ready to use.
+        """
+        deferred_objs = dict()
+        for name in names:
+            if name not in self.devices:
+                raise ValueError(QSMessage.ERR_INVALID_ITEM.format(name, "the devices"))
+            chassis_name = self.devices[name].chassis_name
+            if chassis_name not in deferred_objs:
+                deferred_objs[chassis_name] = self._ensure_chassis(chassis_name)
+
+        ready = list()
+        for chassis_name, twisted_deferred_obj in deferred_objs.items():
+            try:
+                yield twisted_deferred_obj
+                ready.append(chassis_name)
+            except Exception as e:
+                print(sys._getframe().f_code.co_name, chassis_name, e)
+        returnValue(ready)
+
+    @setting(15, "Reset Chassis", names=["*s"], returns=["b"])
+    def reset_chassis(self, c, names):
+        """
+        Initialize the AWGs and capture units of the given chassis again.
+
+        Only the resources used by the devices of each chassis are initialized.
+        The chassis are processed in parallel.
+
+        Args:
+            names : *s
+                Chassis names.
+        """
+        for name in names:
+            if name not in self._chassis_resources:
+                raise ValueError(
+                    QSMessage.ERR_INVALID_ITEM.format(
+                        name, list(self._chassis_resources.keys())
+                    )
+                )
+        deferred_objs = [
+            future_to_deferred(self._thread_pool.submit(self.initializeResources, _n))
+            for _n in names
+        ]
+        for twisted_deferred_obj in deferred_objs:
+            yield twisted_deferred_obj
+        returnValue(True)
+
     @setting(10, "Reload Skew", returns=["b"])
     def reload_config_skew(self, c):
         """
@@ -328,6 +518,152 @@ class QuBE_Server(DeviceServer):
             return False
         return True
 
+    @setting(13, "Reload Links", returns=["(*s*s*s)"])
+    def reload_links(self, c):
+        """
+        Reload possible links and skew from the registry without restarting.
+
+        The new possible links are compared with the live chassis. Only added
+        chassis and those with changed link information are instantiated, in
+        parallel. Removed chassis are shut down. The others keep running.
+
+        Returns:
+            changes : (*s*s*s)
+                The names of the added, removed and updated chassis.
+        """
+        cxn = self.client
+        reg = cxn[QSConstants.REGSRV]
+        yield reg.cd(QSConstants.REGDIR)
+        config = yield reg.get(QSConstants.REGLNK)
+        links = json.loads(config)
+        skew = yield reg.get(QSConstants.REGSKEW)
+        self.chassisSkew = json.loads(skew)
+
+        added = [_n for _n in links if _n not in self.possibleLinks]
+        removed = [_n for _n in self.possibleLinks if _n not in links]
+        updated = [
+            _n
+            for _n in links
+            if _n in self.possibleLinks and links[_n] != self.possibleLinks[_n]
+        ]
+
+        if 0 < len(updated):  # the devices of updated chassis keep their names,
+            self.possibleLinks = {  # so they are once removed from the list.
+                _n: _i for _n, _i in links.items() if _n not in updated
+            }
+            yield self.refreshDeviceList()
+        self.possibleLinks = links
+        yield self.refreshDeviceList()
+
+        returnValue((added, removed, updated))
+
+    @setting(11, "Clock Tracker Status", returns=["*(svvwb)"])
+    def clock_tracker_status(self, c):
+        """
+        Read the status of the chassis clock models.
+
+        The chassis clocks are sampled every QSConstants.CLK_TRACK_IVL seconds and
+        daq_trigger() predicts the current clock from the model instead of
+        reading it. A chassis with an alert falls back to reading the clock.
+
+        Returns:
+            status : *(svvwb)
+                List of (chassis name, drift in ppm, fit residual in clocks,
+                number of samples, alert).
+        """
+        resp = list()
+        for chassis_name in self._sync_ctrl.keys():
+            drift, residual, samples, alert = self._clock_tracker.status(chassis_name)
+            resp.append((chassis_name, float(drift), float(residual), samples, alert))
+        return resp
+
+    @setting(20, "Save Snapshot", path=["s"], returns=["w"])
+    def save_snapshot(self, c, path):
+        """
+        Save the state of all devices to a session snapshot file.
+
+        The snapshot holds the shots, repetition time, sequence length, frequen-
+        cies, readout windows, modes and coefficients of each device, and the
+        digests of the uploaded waveforms. It is a numpy .npz file with JSON
+        metadata and holds no pickled object.
+
+        Args:
+            path : s
+                The snapshot file path on the server host.
+
+        Returns:
+            devices : w
+                The number of devices saved.
+        """
+        devices = list(self.devices.values())
+        concurrent_deferred_objs = [
+            self._thread_pool.submit(dev.snapshot_state) for dev in devices
+        ]
+        snapshot = dict()
+        for dev, concurrent_deferred_obj in zip(devices, concurrent_deferred_objs):
+            try:
+                snapshot[dev.name] = yield future_to_deferred(concurrent_deferred_obj)
+            except Exception as e:
+                print(sys._getframe().f_code.co_name, dev.name, e)
+
+        save_snapshot(path, QSConstants.SNAP_VERSION, snapshot)
+        returnValue(len(snapshot))
+
+    @setting(21, "Restore Snapshot", path=["s"], returns=["(w*(sw))"])
+    def restore_snapshot(self, c, path):
+        """
+        Restore the state of the devices from a session snapshot file.
+
+        The snapshot is compared with the live values and only the differences are
+        written. The chassis are restored in parallel. The readout parameters of
+        the changed mux channels are uploaded to the capture units again. Wave-
+        forms are not in a snapshot; the awg channels whose uploaded waveform
+        differs from the snapshot are returned so that the client uploads only
+        them again.
+
+        Args:
+            path : s
+                The snapshot file path on the server host.
+
+        Returns:
+            result : (w*(sw))
+                The number of items written, and the list of (device name, awg
+                channel) to upload the waveform again.
+        """
+        version, snapshot = load_snapshot(path)
+        if QSConstants.SNAP_VERSION != version:
+            raise ValueError(
+                QSMessage.ERR_SNAPSHOT.format(path, QSConstants.SNAP_VERSION)
+            )
+
+        chassis = dict()
+        for name, state in snapshot.items():
+            if name not in self.devices:
+                print(sys._getframe().f_code.co_name, "not found", name)
+                continue
+            dev = self.devices[name]
+            chassis.setdefault(dev.chassis_name, list()).append((dev, state))
+
+        for twisted_deferred_obj in [self._ensure_chassis(_n) for _n in chassis]:
+            yield twisted_deferred_obj
+
+        def restore_chassis(pairs):  # devices of a chassis share the LSI controller
+            return sum([dev.restore_state(state) for dev, state in pairs])
+
+        deferred_objs = [
+            future_to_deferred(self._thread_pool.submit(restore_chassis, pairs))
+            for pairs in chassis.values()
+        ]
+        writes = 0
+        for twisted_deferred_obj in deferred_objs:
+            writes += yield twisted_deferred_obj
+
+        stale = list()
+        for pairs in chassis.values():
+            for dev, state in pairs:
+                stale.extend([(dev.name, _c) for _c in dev.stale_waveforms(state)])
+        returnValue((writes, stale))
+
     @setting(100, "Shots", num_shots=["w"], returns=["w"])
     def number_of_shots(self, c, num_shots=None):
         """
@@ -446,6 +782,7 @@ class QuBE_Server(DeviceServer):
 
         for chassis_name in c[QSConstants.ACQ_CNXT_TAG].keys():
             for _dev, _m, _units in c[QSConstants.ACQ_CNXT_TAG][chassis_name]:
+                _dev.clear_latched_waveform()
                 print(chassis_name, _units)  # DEBUG
 
         for chassis_name in c[QSConstants.DAC_CNXT_TAG].keys():
@@ -484,16 +821,78 @@ class QuBE_Server(DeviceServer):
         """
         if 1 > len(c[QSConstants.DAC_CNXT_TAG].keys()):
             return False  # Nothing to start.
-        delay = int(c[QSConstants.DAQ_SDLY_TAG] * QSConstants.SYNC_CLOCK + 0.5)
+        c[QSConstants.DAQ_TRAIN_TAG] = self._kick_sequencers(c)
+        return True
+
+    def _kick_sequencers(self, c, count=1, interval=0):
+        """
+        Schedule the synchronous start of the registered AWGs.
+
+        Read the clock value from a chassis and set a planned timing to the
+        sequencers of all the chassis in the device context [c]. When [count] is
+        more than one, a train of start timings spaced by [interval] clocks is
+        queued to the sequencers at once.
+
+        The elapsed time is checked before each sequencer access. If the
+        synchronization delay is used up before anything is queued, the start is
+        scheduled again with a doubled delay. If it is used up after some
+        chassis have been scheduled, their queued start timings cannot be taken
+        back, so the measurement is terminated without retry.
+
+        Returns:
+            clocks : list of the scheduled start timings before skew adjustment.
+        """
+        interval = (interval + 0xF) & 0xFFFFFFFFFFFFFFF0
+        delay = self._synchronization_delay(c, count)
+
+        for retry in range(QSConstants.DAQ_SDLY_RETRY + 1):
+            clocks, queued = self._schedule_sequencers(c, delay, count, interval)
+            if len(c[QSConstants.DAC_CNXT_TAG].keys()) * count == queued:
+                return clocks
+            print("start timing missed with delay", delay)
+            if 0 < queued:
+                self._terminate_daq(c)
+                break
+            delay = 2 * delay
+        raise Exception(QSMessage.ERR_SYNC_MISSED.format(retry + 1))
+
+    def _synchronization_delay(self, c, count=1):
+        """
+        The adaptive delay covers [count] start timings per chassis. For a train,
+        it is never shorter than the fixed delay, since a start is not retried
+        once some of the timings are queued.
+        """
+        adaptive, margin = c[QSConstants.DAQ_ASDLY_TAG]
+        if adaptive:
+            chassis_list = list(c[QSConstants.DAC_CNXT_TAG].keys())
+            delay = self._sync_latency.safe_delay(
+                chassis_list[0], chassis_list, margin, count
+            )
+            if delay is not None and 1 < count:
+                return max(delay, c[QSConstants.DAQ_SDLY_TAG])
+            elif delay is not None:
+                return delay
+        return c[QSConstants.DAQ_SDLY_TAG]
+
+    def _sync_lock(self, chassis_name):
+        """The lock serializing the UDP transactions to the sequencer of a chassis."""
+        return self._sync_locks.setdefault(chassis_name, threading.RLock())
+
+    def _schedule_sequencers(self, c, delay_in_sec, count, interval):
+        delay = int(delay_in_sec * QSConstants.SYNC_CLOCK + 0.5)
 
         chassis_list = c[QSConstants.DAC_CNXT_TAG].keys()
         tentative_master = list(chassis_list)[0]
-        clock = (
-            self._sync_ctrl[tentative_master].read_clock()[1] + delay
-        ) & 0xFFFFFFFFFFFFFFF0
+        started = time.perf_counter()
+        clock = self._clock_tracker.predict(tentative_master, time.monotonic())
+        if clock is None:
+            clock = self._read_chassis_clock(tentative_master)
+        clock = (clock + delay) & 0xFFFFFFFFFFFFFFF0
         # In a case where we use master FPGA
         # board as a trigger source
         # clock = self._master_ctrl.read_clock() + delay
+        clocks = [clock + i * interval for i in range(count)]
+        queued = 0
         for chassis_name in chassis_list:
             skew = self.chassisSkew[chassis_name]
             dev, enabled_awgs = c[QSConstants.DAC_CNXT_TAG][chassis_name]
@@ -501,31 +900,300 @@ class QuBE_Server(DeviceServer):
             for _awg in enabled_awgs:
                 if 0 <= _awg and _awg < 16:
                     awg_bitmap += 1 << _awg
-            resp = self._sync_ctrl[chassis_name].add_sequencer(clock + skew, awg_bitmap)
-            print(chassis_name, "kick at ", clock + skew, enabled_awgs)
+            with self._sync_lock(chassis_name):
+                for _clock in clocks:
+                    # The clock value was sampled after [started]. Once [delay]
+                    # has elapsed since then, the first start timing may have
+                    # passed.
+                    issued = time.perf_counter()
+                    if delay <= int((issued - started) * QSConstants.SYNC_CLOCK):
+                        return clocks, queued
+                    resp = self._sync_ctrl[chassis_name].add_sequencer(
+                        _clock + skew, awg_bitmap
+                    )
+                    self._sync_latency.record(
+                        chassis_name,
+                        SequencerLatencyMonitor.ADD,
+                        time.perf_counter() - issued,
+                    )
+                    queued += 1
+            print(chassis_name, "kick at ", clocks[0] + skew, enabled_awgs)
+        return clocks, queued
 
-        return True
+    @setting(
+        116,
+        "DAQ Trigger Train",
+        count=["w"],
+        interval=["v[s]"],
+        returns=["*w"],
+    )
+    def daq_trigger_train(self, c, count, interval=None):
+        """
+        Queue a train of synchronous measurements.
+
+        Similar to daq_trigger(), but [count] start timings are queued to the
+        sequencers of all the chassis in a single call. The measurements run back-
+        to-back without host involvement and the synchronization delay is paid
+        only once. Use daq_trigger_status() to see which of them have started.
+
+        All the runs would write to the same capture memory, so a train is only
+        for control channels. Readout devices in the context are refused, and
+        daq_stop() returns after the first run.
+
+        Args:
+            count    : w
+                The number of queued measurements. 1 to QSConstants.DAQ_TRAIN_MAX.
+            interval : v[s]
+                The interval of the start timings. The expected run time, i.e.,
+                shots x repetition time, of the registered devices if not given.
+        Returns:
+            clocks   : *w
+                The scheduled start timings in the synchronization clock.
+        """
+        if 1 > len(c[QSConstants.DAC_CNXT_TAG].keys()):
+            return []  # Nothing to start.
+        elif count < 1 or QSConstants.DAQ_TRAIN_MAX < count:
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format(
+                    "count", 1, QSConstants.DAQ_TRAIN_MAX
+                )
+            )
+        elif 0 < len(c[QSConstants.ACQ_CNXT_TAG].keys()):
+            raise ValueError(
+                QSMessage.ERR_TRAIN_CAPTURE.format(
+                    list(c[QSConstants.ACQ_CNXT_TAG].keys())
+                )
+            )
+
+        run_time = max(
+            [
+                _dev.number_of_shots * _dev.repetition_time
+                for _dev, _awgs in c[QSConstants.DAC_CNXT_TAG].values()
+            ]
+        )
+        if interval is None:
+            interval_in_ns = run_time
+        elif interval["ns"] < run_time:
+            raise ValueError(QSMessage.ERR_SHORT_INTERVAL.format(run_time))
+        else:
+            interval_in_ns = interval["ns"]
+
+        interval_in_clock = int(np.ceil(interval_in_ns * 1e-9 * QSConstants.SYNC_CLOCK))
+        clocks = self._kick_sequencers(c, count, interval_in_clock)
+        c[QSConstants.DAQ_TRAIN_TAG] = clocks
+        return clocks
+
+    @setting(117, "DAQ Trigger Status", returns=["*b"])
+    def daq_trigger_status(self, c):
+        """
+        Report which of the measurements queued with daq_trigger_train() have
+        started.
+
+        A measurement is regarded as started when the clocks of all the chassis
+        in the device context have passed its scheduled timing.
+
+        Returns:
+            fired : *b
+                One flag per queued measurement.
+        """
+        clocks = c[QSConstants.DAQ_TRAIN_TAG]
+        fired = [True for _clock in clocks]
+        for chassis_name in c[QSConstants.DAC_CNXT_TAG].keys():
+            skew = self.chassisSkew[chassis_name]
+            concurrent_deferred_obj = self._thread_pool.submit(
+                self._read_chassis_clock, chassis_name
+            )
+            current = yield future_to_deferred(concurrent_deferred_obj)
+            fired = [
+                _fired and _clock + skew <= current
+                for _fired, _clock in zip(fired, clocks)
+            ]
+        returnValue(fired)
 
     @setting(107, "DAQ Stop", returns=["b"])
     def daq_stop(self, c):
         """
         Wait until synchronous measurement is done.
 
-        """
-        if 1 > len(c[QSConstants.DAC_CNXT_TAG].keys()):
-            return False  # Nothing to stop
+        """
+        if 1 > len(c[QSConstants.DAC_CNXT_TAG].keys()):
+            return False  # Nothing to stop
+
+        yield self._wait_for_daq_stop(c)
+
+        if c[QSConstants.DAQ_PIPE_TAG]:
+            yield self._advance_pipeline(c)
+
+        returnValue(True)
+
+    @inlineCallbacks
+    def _wait_for_daq_stop(self, c):  # @inlineCallbacks
+        for chassis_name in c[QSConstants.DAC_CNXT_TAG].keys():
+
+            dev, enabled_awgs = c[QSConstants.DAC_CNXT_TAG][chassis_name]
+            concurrent_deferred_obj = self._thread_pool.submit(
+                dev.stop_daq, list(enabled_awgs), c[QSConstants.DAQ_TOUT_TAG]
+            )
+            twisted_deferred_obj = future_to_deferred(concurrent_deferred_obj)
+
+            result = yield twisted_deferred_obj
+
+    @inlineCallbacks
+    def _advance_pipeline(self, c):  # @inlineCallbacks
+        """
+        Move to the next slot in pipelined operation.
+
+        The captured data of the finished run are latched in host memory, then
+        the staged waveforms and capture parameters are flushed to the hardware
+        and the next run is triggered immediately.
+
+        Returns:
+            triggered : True if the next run has been triggered.
+        """
+        deferred_objs = list()
+        for chassis_name in c[QSConstants.ACQ_CNXT_TAG].keys():
+            for dev, module, units in c[QSConstants.ACQ_CNXT_TAG][chassis_name]:
+                concurrent_deferred_obj = self._thread_pool.submit(
+                    dev.latch_waveform, list(units)
+                )
+                deferred_objs.append(future_to_deferred(concurrent_deferred_obj))
+        for twisted_deferred_obj in deferred_objs:
+            yield twisted_deferred_obj
+
+        staged = c[QSConstants.DAQ_STAGE_TAG]
+        c[QSConstants.DAQ_STAGE_TAG] = dict()
+        staged = [_dev for _dev in staged.values() if _dev.has_staged_parameters]
+        if 1 > len(staged):
+            returnValue(False)  # Nothing to run next.
+
+        chassis = dict()
+        for dev in staged:
+            chassis.setdefault(dev.chassis_name, list()).append(dev)
+
+        def flush_chassis(devs):  # devices of a chassis share the AWG controller
+            for dev in devs:
+                dev.flush_staged_parameters()
+
+        deferred_objs = [
+            future_to_deferred(self._thread_pool.submit(flush_chassis, devs))
+            for devs in chassis.values()
+        ]
+        for twisted_deferred_obj in deferred_objs:
+            yield twisted_deferred_obj
+        yield future_to_deferred(self._thread_pool.submit(self._kick_sequencers, c))
+        returnValue(True)
+
+    @setting(
+        115,
+        "DAQ Sweep",
+        points=["*(v[Hz]v[Hz]v[Hz]v[Hz])"],
+        muxchs=["*w", "w"],
+        channels=["*w", "w"],
+        returns=["*3c"],
+    )
+    def daq_sweep(self, c, points, muxchs, channels=None):
+        """
+        Run a frequency sweep on the server.
+
+        For each point, the local oscillator, the coarse and fine NCOs of the
+        selected readout device are tuned, then a synchronous measurement is
+        triggered and the captured datapoints are downloaded. The waveforms and
+        readout parameters registered in the device context through upload_para
+        meters() and upload_readout_parameters() are used as they are. All the
+        points are validated before the first measurement, and only the values
+        that change from the previous point are written to the hardware.
+
+        Args:
+            points   : *(v[Hz]v[Hz]v[Hz]v[Hz])
+                List of (LO, TX coarse NCO, TX fine NCO, RX coarse NCO) frequencies.
+            muxchs   : *w, w
+                Readout mux channels to download at each point.
+            channels : *w, w
+                AWG channels whose fine NCOs follow the sweep. 0 if not given.
+        Returns:
+            data     : *3c
+                Datapoints indexed by (point, muxch, time).
+        """
+        dev = self.selectedDevice(c)
+        if QSConstants.CNL_READ_VAL != dev.device_role:
+            raise Exception(
+                QSMessage.ERR_INVALID_DEV.format("readout", dev.device_name)
+            )
+        elif 1 > len(c[QSConstants.DAC_CNXT_TAG].keys()):
+            raise Exception(QSMessage.ERR_NOARMED_DAC)
+
+        muxchs = np.atleast_1d(muxchs).astype(int)
+        for _mux in muxchs:
+            if not dev.static_check_mux_channel_range(_mux):
+                raise ValueError(
+                    QSMessage.ERR_INVALID_RANG.format(
+                        "muxch", 0, QSConstants.ACQ_MULP - 1
+                    )
+                )
+        channels = np.atleast_1d(0 if channels is None else channels).astype(int)
+        if not dev.check_awg_channels(channels):
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format(
+                    "awg index", 0, dev.number_of_awgs - 1
+                )
+            )
+
+        sweep = [tuple(_f["MHz"] for _f in _point) for _point in points]
+        for idx, (lo, cnco, fnco, rxnco) in enumerate(sweep):
+            if not dev.static_check_lo_frequency(lo):
+                message = QSMessage.ERR_FREQ_SETTING.format(
+                    "LO", QSConstants.DAQ_LO_RESOL
+                )
+            elif not dev.static_check_dac_coarse_frequency(cnco):
+                message = QSMessage.ERR_FREQ_SETTING.format(
+                    "TX Corse NCO", QSConstants.DAC_CNCO_RESOL
+                )
+            elif not dev.static_check_dac_fine_frequency(fnco):
+                message = QSMessage.ERR_FREQ_SETTING.format(
+                    "TX Fine NCO", QSConstants.DAC_FNCO_RESOL
+                )
+            elif not dev.static_check_adc_coarse_frequency(rxnco):
+                message = QSMessage.ERR_FREQ_SETTING.format(
+                    "RX Corse NCO", QSConstants.ADC_CNCO_RESOL
+                )
+            else:
+                continue
+            raise ValueError(QSMessage.ERR_SWEEP_POINT.format(idx) + message)
 
-        for chassis_name in c[QSConstants.DAC_CNXT_TAG].keys():
+        self._readout_mux_start(c)
+        dev.clear_latched_waveform()
 
-            dev, enabled_awgs = c[QSConstants.DAC_CNXT_TAG][chassis_name]
+        vault = list()
+        previous = (None, None, None, None)
+        for point in sweep:
             concurrent_deferred_obj = self._thread_pool.submit(
-                dev.stop_daq, list(enabled_awgs), c[QSConstants.DAQ_TOUT_TAG]
+                self._apply_sweep_point, dev, channels, point, previous
             )
-            twisted_deferred_obj = future_to_deferred(concurrent_deferred_obj)
+            yield future_to_deferred(concurrent_deferred_obj)
+            previous = point
 
-            result = yield twisted_deferred_obj
+            self._kick_sequencers(c)
+            yield self._wait_for_daq_stop(c)
 
-        returnValue(True)
+            concurrent_deferred_obj = self._thread_pool.submit(
+                dev.download_waveform, muxchs
+            )
+            data = yield future_to_deferred(concurrent_deferred_obj)
+            vault.append(data)
+
+        returnValue(np.stack(vault))
+
+    def _apply_sweep_point(self, dev, channels, point, previous):
+        lo, cnco, fnco, rxnco = point
+        if lo != previous[0]:
+            dev.set_lo_frequency(lo)
+        if cnco != previous[1]:
+            dev.set_dac_coarse_frequency(cnco)
+        if fnco != previous[2]:
+            for channel in channels:
+                dev.set_dac_fine_frequency(channel, fnco)
+        if rxnco != previous[3]:
+            dev.set_adc_coarse_frequency(rxnco)
 
     @setting(112, "DAQ Clear", returns=["b"])
     def daq_clear(self, c):
@@ -547,6 +1215,10 @@ class QuBE_Server(DeviceServer):
         if 1 > len(c[QSConstants.DAC_CNXT_TAG].keys()):
             return False
 
+        self._terminate_daq(c)
+        return True
+
+    def _terminate_daq(self, c):
         for chassis_name in c[QSConstants.DAC_CNXT_TAG].keys():
             dev, enabled_awgs = c[QSConstants.DAC_CNXT_TAG][chassis_name]
             dev.terminate_daq(list(enabled_awgs))
@@ -555,7 +1227,29 @@ class QuBE_Server(DeviceServer):
             for dev, module, units in c[QSConstants.ACQ_CNXT_TAG][chassis_name]:
                 dev.terminate_acquisition(units)
 
-        return True
+    @setting(114, "DAQ Pipeline", enable=["b"], returns=["b"])
+    def daq_pipeline(self, c, enable=None):
+        """
+        Read and write the pipelined operation mode.
+
+        In the pipelined mode, daq_stop() latches the captured data in host memory,
+        flushes the parameters staged with stage_waveform() and stage_readout_par
+        ameters(), and triggers the next run right after the current run stops.
+        download_waveform() returns the latched data of the finished run while the
+        next run is in progress.
+
+        Args:
+            enable : b
+                True to enable the pipelined mode.
+        Returns:
+            enable : b
+        """
+        if enable is None:
+            return c[QSConstants.DAQ_PIPE_TAG]
+        c[QSConstants.DAQ_PIPE_TAG] = enable
+        if not enable:
+            c[QSConstants.DAQ_STAGE_TAG] = dict()
+        return enable
 
     @setting(108, "DAQ Timeout", t=["v[s]"], returns=["v[s]"])
     def daq_timeout(self, c, t=None):
@@ -575,6 +1269,68 @@ class QuBE_Server(DeviceServer):
             c[QSConstants.DAQ_SDLY_TAG] = t["s"]
             return t
 
+    @setting(
+        118,
+        "DAQ Adaptive Synchronization",
+        enable=["b"],
+        margin=["v"],
+        returns=["bv"],
+    )
+    def daq_adaptive_sync_delay(self, c, enable=None, margin=None):
+        """
+        Read and write the adaptive synchronization delay setting.
+
+        When enabled, daq_trigger() chooses the synchronization delay from the
+        measured round-trip time of read_clock() and add_sequencer() of the
+        chassis in the device context, multiplied by [margin]. The value set by
+        daq_synchronization_delay() is used until the latencies are measured.
+
+        Args:
+            enable : b
+                True to enable the adaptive synchronization delay.
+            margin : v
+                Multiplier to the measured latency. 3.0 by default.
+        Returns:
+            (enable, margin) : bv
+        """
+        adaptive, _margin = c[QSConstants.DAQ_ASDLY_TAG]
+        if enable is not None:
+            adaptive = enable
+        if margin is not None:
+            if 1.0 > margin:
+                raise ValueError(
+                    QSMessage.ERR_INVALID_RANG.format("margin", 1.0, "infinity")
+                )
+            _margin = margin
+        c[QSConstants.DAQ_ASDLY_TAG] = (adaptive, _margin)
+        return (adaptive, _margin)
+
+    @setting(119, "DAQ Sequencer Latency", returns=["*(sv[s]v[s])"])
+    def daq_sequencer_latency(self, c):
+        """
+        Read the measured latencies of the sequencer accesses.
+
+        Returns:
+            latencies : *(sv[s]v[s])
+                List of (chassis name, read_clock() latency, add_sequencer()
+                latency). The worst value in the recent samples is shown, and
+                zero is given if not measured.
+        """
+        resp = list()
+        for chassis_name in self._sync_ctrl.keys():
+            read = self._sync_latency.estimate(
+                chassis_name, SequencerLatencyMonitor.READ
+            )
+            add = self._sync_latency.estimate(chassis_name, SequencerLatencyMonitor.ADD)
+            resp.append(
+                (
+                    chassis_name,
+                    T.Value(0.0 if read is None else read, "s"),
+                    T.Value(0.0 if add is None else add, "s"),
+                )
+            )
+        return resp
+
     @setting(110, "DAC Channels", returns=["w"])
     def daq_channels(self, c):
         """
@@ -737,7 +1493,44 @@ class QuBE_Server(DeviceServer):
         """
         dev = self.selectedDevice(c)
         channels = np.atleast_1d(channels).astype(int)
-        waveforms = np.atleast_2d(wavedata).astype(complex)
+        waveforms = np.atleast_2d(np.asarray(wavedata, dtype=complex))  # no copy
+
+        if not dev.check_awg_channels(channels):
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format(
+                    "awg index", 0, dev.number_of_awgs - 1
+                )
+            )
+
+        resp, number_of_chans, iq_samples = dev.check_waveform(waveforms, channels)
+        if not resp:
+            raise ValueError(QSMessage.ERR_INVALID_WAVD.format(number_of_chans))
+
+        return dev.upload_waveform(iq_samples, channels)
+
+    @setting(
+        204,
+        "Stage Waveform",
+        wavedata=["*2c", "*c"],
+        channels=["*w", "w"],
+        returns=["b"],
+    )
+    def stage_waveform(self, c, wavedata, channels):
+        """
+        Stage waveforms for the next run in pipelined operation.
+
+        The arguments are the same as upload_waveform(). The waveforms are kept in
+        the shadow slot of the device and are written to the FPGAs by daq_stop()
+        just before the next run is triggered. The AWG channels have to be
+        registered with upload_parameters() beforehand.
+
+        Args:
+            wavedata : *2c,*c
+            channels : *w, w
+        """
+        dev = self.selectedDevice(c)
+        channels = np.atleast_1d(channels).astype(int)
+        waveforms = np.atleast_2d(np.asarray(wavedata, dtype=complex))  # no copy
 
         if not dev.check_awg_channels(channels):
             raise ValueError(
@@ -746,11 +1539,143 @@ class QuBE_Server(DeviceServer):
                 )
             )
 
-        resp, number_of_chans, data_length = dev.check_waveform(waveforms, channels)
+        resp, number_of_chans, iq_samples = dev.check_waveform(waveforms, channels)
         if not resp:
             raise ValueError(QSMessage.ERR_INVALID_WAVD.format(number_of_chans))
 
-        return dev.upload_waveform(waveforms, channels)
+        resp = dev.stage_waveform(iq_samples, channels)
+        if resp:
+            c[QSConstants.DAQ_STAGE_TAG].update({dev.device_name: dev})
+        return resp
+
+    @setting(
+        206,
+        "Upload Waveform Chunk",
+        wavedata=["*c"],
+        channel=["w"],
+        offset=["w"],
+        returns=["w"],
+    )
+    def upload_waveform_chunk(self, c, wavedata, channel, offset=0):
+        """
+        Stage a slice of a long waveform on the server.
+
+        A long waveform can be sent over several calls instead of a single huge
+        message. The slice is quantized on arrival into the host buffer of the
+        channel, so the server holds 4 bytes per sample instead of the complex
+        data. Nothing is written to the AWG memory until commit_waveform(). The
+        slices have to be sent in order, starting from offset 0.
+
+        Args:
+            wavedata : *c
+                Complex waveform slice with a sampling interval of 2 ns [QSConstants.
+                DAC_WVSAMP_IVL].
+
+            channel : w
+                The awg channel.
+
+            offset : w
+                The index of the first sample of the slice. Zero (re)starts the
+                waveform of the channel.
+
+        Returns:
+            written : w
+                The number of samples written to the channel, i.e., the offset of
+                the next slice.
+        """
+        dev = self.selectedDevice(c)
+        waveform = np.asarray(wavedata, dtype=complex).ravel()  # no copy
+
+        if not dev.check_awg_channels([channel]):
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format(
+                    "awg index", 0, dev.number_of_awgs - 1
+                )
+            )
+
+        position = dev.waveform_chunk_position(channel)
+        if 0 != offset and position != offset:
+            raise ValueError(QSMessage.ERR_CHUNK_OFFSET.format(position, channel))
+
+        length = dev.sequence_length // QSConstants.DAC_WVSAMP_IVL
+        if length < offset + len(waveform):
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format(
+                    "offset + length of wavedata", 0, length
+                )
+            )
+
+        if not dev.write_waveform_chunk(waveform, channel, offset):
+            raise ValueError(QSMessage.ERR_INVALID_WAVD.format(5))
+
+        return dev.waveform_chunk_position(channel)
+
+    @setting(207, "Commit Waveform", channels=["*w", "w"], returns=["b"])
+    def commit_waveform(self, c, channels):
+        """
+        Upload the waveforms staged by upload_waveform_chunk() to FPGAs.
+
+        The whole waveform of each channel is written to the AWG memory at once,
+        and its host buffer is released.
+
+        Args:
+            channels: *w, w
+                List of the channels, or a channel, to commit. The waveform of
+                each channel must be complete.
+        """
+        dev = self.selectedDevice(c)
+        channels = np.atleast_1d(channels).astype(int)
+
+        if not dev.check_awg_channels(channels):
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format(
+                    "awg index", 0, dev.number_of_awgs - 1
+                )
+            )
+
+        length = dev.sequence_length // QSConstants.DAC_WVSAMP_IVL
+        for _c in channels:
+            written = dev.waveform_chunk_position(_c)
+            if length != written:
+                raise ValueError(
+                    QSMessage.ERR_CHUNK_INCOMPLETE.format(written, length, _c)
+                )
+
+        return dev.commit_waveform_chunks(channels)
+
+    @setting(205, "Stage Readout Parameters", muxchs=["*w", "w"], returns=["b"])
+    def stage_readout_parameters(self, c, muxchs):
+        """
+        Stage readout demodulator parameters for the next run in pipelined
+        operation.
+
+        The capture parameters are prepared from the current readout settings and
+        are written to the capture units by daq_stop() just before the next run
+        is triggered. The mux channels have to be registered with upload_readout_
+        parameters() beforehand.
+
+        Args:
+            muxchs: w, *w
+                multiplex channel   0 to 3 [QSConstants.ACQ_MULP-1]
+        """
+        dev = self.selectedDevice(c)
+        if QSConstants.CNL_READ_VAL != dev.device_role:
+            raise Exception(
+                QSMessage.ERR_INVALID_DEV.format("readout", dev.device_name)
+            )
+
+        muxchs = np.atleast_1d(muxchs).astype(int)
+        for _mux in muxchs:
+            if not dev.static_check_mux_channel_range(_mux):
+                raise ValueError(
+                    QSMessage.ERR_INVALID_RANG.format(
+                        "muxch", 0, QSConstants.ACQ_MULP - 1
+                    )
+                )
+        resp = dev.stage_readout_parameters(muxchs)
+        if resp:
+            c[QSConstants.DAQ_STAGE_TAG].update({dev.device_name: dev})
+        return resp
 
     @setting(203, "Download Waveform", muxchs=["*w", "w"], returns=["*c", "*2c"])
     def download_waveform(self, c, muxchs):
@@ -784,6 +1709,48 @@ class QuBE_Server(DeviceServer):
 
         return data
 
+    @setting(209, "Download Summed Values", muxchs=["*w", "w"], returns=["*3c"])
+    def download_summed_values(self, c, muxchs):
+        """
+        Download the summed values of acquisition windows arranged by shots.
+
+        It is available in the acquisition modes with summation, 'A' and 'B'. In
+        mode 'A', a value is obtained per window and shot. In mode 'B', the shots
+        are averaged and the shot axis has a single element. The mux channels
+        must have the same number of windows.
+
+        Args:
+            muxchs  : *w, w
+
+        Returns:
+            data    : *3c
+                Complex values of (mux channels, shots, windows).
+        """
+        dev = self.selectedDevice(c)
+        if QSConstants.CNL_READ_VAL != dev.device_role:
+            raise Exception(
+                QSMessage.ERR_INVALID_DEV.format("readout", dev.device_name)
+            )
+
+        muxchs = np.atleast_1d(muxchs).astype(int)
+        for _mux in muxchs:
+            if not dev.static_check_mux_channel_range(_mux):
+                raise ValueError(
+                    QSMessage.ERR_INVALID_RANG.format(
+                        "muxch", 0, QSConstants.ACQ_MULP - 1
+                    )
+                )
+            decim, averg, summn = QSConstants.ACQ_MODEFUNC[dev.acquisition_mode[_mux]]
+            if not summn:
+                raise ValueError(
+                    QSMessage.ERR_INVALID_ITEM.format("Acquisition mode", "A or B")
+                )
+
+        data = dev.download_summed_values(muxchs)
+        if 1 < len({_d.shape for _d in data}):
+            raise ValueError(QSMessage.ERR_INVALID_WIND)
+        return np.stack(data)
+
     @setting(300, "Acquisition Count", acqcount=["w"], returns=["w"])
     def acquisition_count(self, c, acqcount=None):
         """
@@ -809,7 +1776,9 @@ class QuBE_Server(DeviceServer):
            muxch   : w
                 Multiplex channel id. 0 to 3 [QSConstants.ACQ_MULP-1] can be set
            acqnumb : w
-                The number of acquisition in a single experiment. 1 to 8 can be set.
+                The number of acquisition in a single experiment. It can be reduced
+                down to 1. The windows are kept from the first, and added by
+                acquisition_window() up to 4096 [QSConstants.ACQ_MAXNUMCAPT].
         """
         dev = self.selectedDevice(c)
         if QSConstants.CNL_READ_VAL != dev.device_role:
@@ -821,9 +1790,9 @@ class QuBE_Server(DeviceServer):
                 QSMessage.ERR_INVALID_RANG.format("muxch", 0, QSConstants.ACQ_MULP - 1)
             )
         elif acqnumb is None:
-            return dev.acquisition_number_of_windows[muxch]
+            return int(dev.readout_state.number_of_windows[muxch])
         elif 0 < acqnumb and acqnumb <= QSConstants.ACQ_MAXNUMCAPT:
-            dev.acquisition_number_of_windows[muxch] = acqnumb
+            dev.set_acquisition_number_of_windows(muxch, acqnumb)
             return acqnumb
         else:
             raise ValueError(
@@ -870,7 +1839,7 @@ class QuBE_Server(DeviceServer):
             )
         elif window is None:
             return [
-                (T.Value(_s, "ns"), T.Value(_e, "ns"))
+                (T.Value(int(_s), "ns"), T.Value(int(_e), "ns"))
                 for _s, _e in dev.acquisition_window[muxch]
             ]
 
@@ -937,7 +1906,7 @@ class QuBE_Server(DeviceServer):
                 QSMessage.ERR_INVALID_RANG.format("muxch", 0, QSConstants.ACQ_MULP - 1)
             )
         elif mode is None:
-            return dev.acquisition_mode[muxch]
+            return str(dev.acquisition_mode[muxch])
         elif mode in QSConstants.ACQ_MODENUMBER:
             dev.set_acquisition_mode(muxch, mode)
             return mode
@@ -1108,6 +2077,213 @@ class QuBE_Server(DeviceServer):
             dev.set_acquisition_window_coefficient(muxch, coeffs)
         return True
 
+    @setting(
+        309,
+        "Acquisition FIR Design",
+        muxch=["w"],
+        kind=["s"],
+        frequency=["v[Hz]"],
+        params=["*v", "*c"],
+        length=["w"],
+        returns=["*c"],
+    )
+    def acquisition_fir_design(self, c, muxch, kind, frequency, params, length=None):
+        """
+        Design and set FIR filter coefficients to a mux channel.
+
+        Designed coefficients are cached, so that revisiting a frequency in a sweep
+        does not compute them again.
+
+        Args:
+            muxch     : w
+                Multiplex readout mux channel. 0-3 can be set
+
+            kind      : s
+                gaussian, raised_cosine, matched or kaiser.
+
+            frequency : v[Hz]
+                The base-band frequency of the readout signal before decimation.
+
+            params    : *v, *c
+                (sigma in ns) for gaussian, (roll-off ratio) for raised_cosine,
+                (beta) for kaiser, or the reference trace sampled at 500 MSa/s
+                for matched.
+
+            length    : w
+                The number of taps. QSConstants.ACQ_MAX_FCOEF if not given.
+
+        Returns:
+            coeffs    : *c
+                The coefficients set, normalized to the full scale.
+        """
+        if length is None:
+            length = QSConstants.ACQ_MAX_FCOEF
+        return self._design_acquisition_coefficients(
+            c, "fir", muxch, kind, frequency, params, length
+        )
+
+    @setting(
+        310,
+        "Acquisition Window Design",
+        muxch=["w"],
+        kind=["s"],
+        frequency=["v[Hz]"],
+        params=["*v", "*c"],
+        length=["w"],
+        returns=["*c"],
+    )
+    def acquisition_window_design(
+        self, c, muxch, kind, frequency, params, length=None
+    ):
+        """
+        Design and set complex window coefficients to a mux channel.
+
+        Designed coefficients are cached, so that revisiting a frequency in a sweep
+        does not compute them again.
+
+        Args:
+            muxch     : w
+                Multiplex readout mux channel. 0-3 can be set
+
+            kind      : s
+                gaussian, raised_cosine, matched or kaiser.
+
+            frequency : v[Hz]
+                The base-band frequency of the readout signal before decimation.
+
+            params    : *v, *c
+                (sigma in ns) for gaussian, (roll-off ratio) for raised_cosine,
+                (beta) for kaiser, or the reference trace sampled at 125 MSa/s
+                for matched.
+
+            length    : w
+                The number of coefficients. It covers the longest acquisition
+                window if not given.
+
+        Returns:
+            coeffs    : *c
+                The coefficients set, normalized to the full scale.
+        """
+        if length is None:
+            dev = self.selectedDevice(c)
+            if QSConstants.CNL_READ_VAL == dev.device_role:
+                window = dev.acquisition_window[muxch]
+                length = int(np.max(window[:, 1] - window[:, 0], initial=0)) // int(
+                    1000 / QSConstants.ADCDCM_SAMPLE_R
+                )
+        return self._design_acquisition_coefficients(
+            c, "window", muxch, kind, frequency, params, length
+        )
+
+    @setting(
+        311,
+        "Acquisition Matched Window",
+        muxch=["w"],
+        traces0=["*2c"],
+        traces1=["*2c"],
+        whiten=["b"],
+        returns=["v"],
+    )
+    def acquisition_matched_window(self, c, muxch, traces0, traces1, whiten=False):
+        """
+        Set the window coefficients of a mux channel matched to two states.
+
+        The traces are the captures of the states in the acquisition mode '2',
+        obtained with download_waveform(). The weights are the difference of the
+        mean traces of the states. They are optionally whitened by the noise
+        covariance of the traces. Traces longer than QSConstants.ACQ_MAX_WCOEF
+        samples are truncated.
+
+        Args:
+            muxch   : w
+                Multiplex readout mux channel. 0-3 can be set
+
+            traces0 : *2c
+                (captures, samples) of the first state, e.g. |g>.
+
+            traces1 : *2c
+                (captures, samples) of the second state, e.g. |e>.
+
+            whiten  : b
+                Whiten the noise with its covariance. False if not given.
+
+        Returns:
+            gain    : v
+                The expected SNR of the separation of the states over that with
+                the window coefficients set before, or a rectangular window.
+        """
+        dev = self.selectedDevice(c)
+        traces0 = np.atleast_2d(np.asarray(traces0, dtype=complex))
+        traces1 = np.atleast_2d(np.asarray(traces1, dtype=complex))
+        if QSConstants.CNL_READ_VAL != dev.device_role:
+            raise Exception(
+                QSMessage.ERR_INVALID_DEV.format("readout", dev.device_name)
+            )
+        elif not dev.static_check_mux_channel_range(muxch):
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format("muxch", 0, QSConstants.ACQ_MULP - 1)
+            )
+        elif (
+            2 != traces0.ndim
+            or traces0.shape[1:] != traces1.shape[1:]
+            or 2 > min(len(traces0), len(traces1))
+            or 1 > traces0.shape[1]
+        ):
+            raise ValueError(QSMessage.ERR_CALIB_TRACES)
+
+        length = min(traces0.shape[1], QSConstants.ACQ_MAX_WCOEF)
+        coeffs, gain = dsp.matched_window(
+            traces0[:, :length],
+            traces1[:, :length],
+            whiten=bool(whiten),
+            reference=dev.readout_state.window_coefs(muxch),
+        )
+        if coeffs is None:
+            raise ValueError(QSMessage.ERR_CALIB_TRACES)
+        dev.set_acquisition_window_coefficient(muxch, coeffs, quantized=True)
+        return gain
+
+    def _design_acquisition_coefficients(
+        self, c, target, muxch, kind, frequency, params, length
+    ):
+        dev = self.selectedDevice(c)
+        max_length = (
+            QSConstants.ACQ_MAX_FCOEF if "fir" == target else QSConstants.ACQ_MAX_WCOEF
+        )
+        if QSConstants.CNL_READ_VAL != dev.device_role:
+            raise Exception(
+                QSMessage.ERR_INVALID_DEV.format("readout", dev.device_name)
+            )
+        elif not dev.static_check_mux_channel_range(muxch):
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format("muxch", 0, QSConstants.ACQ_MULP - 1)
+            )
+        elif kind not in dsp.COEF_TYPES:
+            raise ValueError(QSMessage.ERR_INVALID_ITEM.format("kind", dsp.COEF_TYPES))
+        elif length is None or not 0 < length <= max_length:
+            raise ValueError(
+                QSMessage.ERR_INVALID_RANG.format("length", 1, max_length)
+            )
+
+        try:
+            coeffs = dsp.design_coefficients(
+                target,
+                kind,
+                frequency["MHz"],
+                int(length),
+                tuple(np.asarray(params).tolist()),
+            )
+        except (TypeError, ValueError):
+            coeffs = None
+        if coeffs is None:
+            raise ValueError(QSMessage.ERR_COEF_DESIGN.format(kind, list(params)))
+
+        if "fir" == target:
+            dev.set_acquisition_fir_coefficient(muxch, coeffs, quantized=True)
+            return coeffs / QSConstants.ACQ_FCBIT_POW_HALF
+        dev.set_acquisition_window_coefficient(muxch, coeffs, quantized=True)
+        return coeffs / QSConstants.ACQ_WCBIT_POW_HALF
+
     @setting(400, "Frequency Local", frequency=["v[Hz]"], returns=["v[Hz]"])
     def frequency_local(self, c, frequency=None):
         """
@@ -1,12 +1,12 @@
 import os
-import sys
-import subprocess
 import json
+import zipfile
+import subprocess
+import collections
 
-from e7awgsw import CaptureCtrl
-from e7awgsw.memorymap import CaptureMasterCtrlRegs
+import numpy as np
 
-from constants import QSConstants
+from constants import QSConstants, QSMessage
 
 ############################################################
 #
@@ -21,357 +21,331 @@ def pingger(host):
 
 ############################################################
 #
-# e7awgsw wrappers
+# SEQUENCER LATENCY
 #
-class QuBECaptureCtrl(CaptureCtrl):
-
-    def terminate_capture_units(self, *capture_unit_id_list):
-        with self._CaptureCtrl__flock:
-            self._CaptureCtrl__select_ctrl_target(*capture_unit_id_list)
-            self._CaptureCtrl__reg_access.write_bits(
-                CaptureMasterCtrlRegs.ADDR,
-                CaptureMasterCtrlRegs.Offset.CTRL,
-                CaptureMasterCtrlRegs.Bit.CTRL_TERMINATE,
-                1,
-                0,
-            )
-            self._CaptureCtrl__reg_access.write_bits(
-                CaptureMasterCtrlRegs.ADDR,
-                CaptureMasterCtrlRegs.Offset.CTRL,
-                CaptureMasterCtrlRegs.Bit.CTRL_TERMINATE,
-                1,
-                1,
-            )
-            self._CaptureCtrl__reg_access.write_bits(
-                CaptureMasterCtrlRegs.ADDR,
-                CaptureMasterCtrlRegs.Offset.CTRL,
-                CaptureMasterCtrlRegs.Bit.CTRL_TERMINATE,
-                1,
-                0,
-            )
-            self._CaptureCtrl__deselect_ctrl_target(*capture_unit_id_list)
+class SequencerLatencyMonitor:
+    """
+    Rolling estimate of the round-trip time of sequencer accesses.
+
+    The latencies of read_clock() and add_sequencer() are recorded per chassis
+    and the latest QSConstants.DAQ_SDLY_WINDOW samples are kept. safe_delay()
+    gives the smallest synchronization delay that covers the worst recent
+    latencies of a trigger operation with a margin.
+    """
+
+    READ = "read_clock"
+    ADD = "add_sequencer"
+
+    def __init__(self, window=QSConstants.DAQ_SDLY_WINDOW):
+        self._window = window
+        self._samples = dict()
+
+    def record(self, chassis_name, kind, seconds):
+        key = (chassis_name, kind)
+        if key not in self._samples:
+            self._samples[key] = collections.deque(maxlen=self._window)
+        self._samples[key].append(seconds)
+
+    def estimate(self, chassis_name, kind):
+        samples = self._samples.get((chassis_name, kind))
+        return max(samples) if samples else None
+
+    def safe_delay(self, master, chassis_list, margin, count=1):
+        """
+        Args:
+            master       : the chassis whose clock is read.
+            chassis_list : the chassis to which the sequencer entries are added.
+            margin       : multiplier applied to the estimated latency.
+            count        : the number of entries added to each chassis.
+        Returns:
+            delay        : seconds, or None if the latencies have not been measured.
+        """
+        latency = self.estimate(master, self.READ)
+        for chassis_name in chassis_list:
+            add = self.estimate(chassis_name, self.ADD)
+            if latency is None or add is None:
+                return None
+            latency += count * add
+        return max(latency * margin, QSConstants.DAQ_SDLY_MIN)
+
+
+class ChassisClockTracker:
+    """
+    Linear model of chassis clocks against the host monotonic time.
+
+    Samples of (host time, chassis clock) are accumulated per chassis and a
+    line is fitted to the latest QSConstants.CLK_TRACK_WINDOW samples. predict()
+    gives the current chassis clock without any I/O as long as the model is
+    fresh and healthy. An alert is raised when the clock rate deviates from
+    QSConstants.SYNC_CLOCK or the fit residual grows beyond the thresholds.
+    """
+
+    def __init__(self, window=QSConstants.CLK_TRACK_WINDOW):
+        self._window = window
+        self._samples = dict()
+        self._models = dict()
+
+    def add_sample(self, chassis_name, host_time, clock):
+        if chassis_name not in self._samples:
+            self._samples[chassis_name] = collections.deque(maxlen=self._window)
+        samples = self._samples[chassis_name]
+        if samples and clock < samples[-1][1]:
+            samples.clear()  # the clock has been reset, e.g., by resynchronization
+        samples.append((host_time, clock))
+        self._fit(chassis_name)
+
+    def _fit(self, chassis_name):
+        samples = self._samples[chassis_name]
+        if len(samples) < QSConstants.CLK_TRACK_MINSAMP:
+            self._models.pop(chassis_name, None)
+            return
+
+        t0, c0 = samples[0]  # offsets keep the fit in double precision
+        t = np.array([_t - t0 for _t, _c in samples])
+        y = np.array([_c - c0 for _t, _c in samples], dtype=float)
+        slope, intercept = np.polyfit(t, y, 1)
+        residual = np.max(np.abs(y - (slope * t + intercept)))
+        drift = (slope / QSConstants.SYNC_CLOCK - 1) * 1e6  # ppm
+
+        alert = bool(
+            QSConstants.CLK_DRIFT_PPM < abs(drift)
+            or QSConstants.CLK_RESID_TICKS < residual
+        )
+        if alert:
+            print(QSMessage.ALERT_CLOCK_MODEL.format(chassis_name, drift, residual))
+        self._models[chassis_name] = (
+            t0,
+            c0,
+            slope,
+            intercept,
+            residual,
+            drift,
+            samples[-1][0],
+            alert,
+        )
+
+    def predict(self, chassis_name, host_time):
+        """
+        Returns:
+            clock : the predicted chassis clock, or None if the model is not usable.
+                    The clock is overestimated by the fit residual so that a
+                    start timing derived from it is never in the past.
+        """
+        if chassis_name not in self._models:
+            return None
+        t0, c0, slope, intercept, residual, drift, last, alert = self._models[
+            chassis_name
+        ]
+        if alert or QSConstants.CLK_TRACK_TTL < host_time - last:
+            return None
+        return c0 + int(slope * (host_time - t0) + intercept + residual + 0.5)
+
+    def status(self, chassis_name):
+        """
+        Returns:
+            (drift, residual, samples, alert) : drift in ppm, residual in clocks.
+        """
+        samples = len(self._samples.get(chassis_name, []))
+        if chassis_name not in self._models:
+            return (0.0, 0.0, samples, False)
+        t0, c0, slope, intercept, residual, drift, last, alert = self._models[
+            chassis_name
+        ]
+        return (drift, residual, samples, alert)
+
+    def discard(self, chassis_name):
+        self._samples.pop(chassis_name, None)
+        self._models.pop(chassis_name, None)
+
 
 ############################################################
 #
-# AUX SUBROUTINES FOR EASY SETUP
+# SESSION SNAPSHOT
 #
-# > import labrad
-# > import QubeServer
-# > cxn  = labrad.connect()
-# > conf = QubeServer.basic_config()
-# > QubeServer.load_config(cxn,conf)
-# > QubeServer.load_skew_zer(cxn)
-#
-def basic_config():
-
-    _name_tag = QSConstants.CNL_NAME_TAG
-    _type_tag = QSConstants.CNL_TYPE_TAG
-    _control_val = QSConstants.CNL_CTRL_VAL
-    _readout_val = QSConstants.CNL_READ_VAL
-    mixer_tag = QSConstants.CNL_MIXCH_TAG
-    usb_lsb_tag = QSConstants.CNL_MIXSB_TAG
-    usb_val = QSConstants.CNL_MXUSB_VAL
-    lsb_val = QSConstants.CNL_MXLSB_VAL
-    gpiosw_tag = QSConstants.CNL_GPIOSW_TAG
-
-    control_qube_500_1500 = [
-        {
-            _name_tag: "control_0",
-            _type_tag: _control_val,
-            "ch_dac": [15],  # awg id
-            "cnco_dac": (0, 0),  # chip, main path id
-            "fnco_dac": [(0, 0)],  # chip, link no
-            "lo_dac": 0,  # local oscillator id
-            mixer_tag: 0,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0003,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_2",
-            _type_tag: _control_val,
-            "ch_dac": [14],  # awg id
-            "cnco_dac": (0, 1),  # chip, main path id
-            "fnco_dac": [(0, 1)],  # chip, link no
-            "lo_dac": 1,  # local oscillator id
-            mixer_tag: 1,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0004,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_5",
-            _type_tag: _control_val,
-            "ch_dac": [11, 12, 13],  # awg id
-            "cnco_dac": (0, 2),  # chip, main path id
-            "fnco_dac": [(0, 4), (0, 3), (0, 2)],  # chip, link no
-            "lo_dac": 2,  # local oscillator id
-            mixer_tag: 2,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0020,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_6",
-            _type_tag: _control_val,
-            "ch_dac": [8, 9, 10],  # awg id
-            "cnco_dac": (0, 3),  # chip, main path id
-            "fnco_dac": [(0, 5), (0, 6), (0, 7)],  # chip, link no
-            "lo_dac": 3,  # local oscillator id
-            mixer_tag: 3,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0040,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_7",
-            _type_tag: _control_val,
-            "ch_dac": [5, 6, 7],  # awg id
-            "cnco_dac": (1, 0),  # chip, main path id
-            "fnco_dac": [(1, 2), (1, 1), (1, 0)],  # chip, link no
-            "lo_dac": 4,  # local oscillator id
-            mixer_tag: 4,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0080,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_8",
-            _type_tag: _control_val,
-            "ch_dac": [0, 3, 4],  # awg id
-            "cnco_dac": (1, 1),  # chip, main path id
-            "fnco_dac": [(1, 5), (1, 4), (1, 3)],  # chip, link no
-            "lo_dac": 5,  # local oscillator id
-            mixer_tag: 5,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0100,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_b",
-            _type_tag: _control_val,
-            "ch_dac": [1],  # awg id
-            "cnco_dac": (1, 2),  # chip, main path id
-            "fnco_dac": [(1, 6)],  # chip, link no
-            "lo_dac": 6,  # local oscillator id
-            mixer_tag: 6,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0800,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_d",
-            _type_tag: _control_val,
-            "ch_dac": [2],  # awg id
-            "cnco_dac": (1, 3),  # chip, main path id
-            "fnco_dac": [(1, 7)],  # chip, link no
-            "lo_dac": 7,  # local oscillator id
-            mixer_tag: 7,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x2000,  # switch mask bit(s)
-        },
-    ]
-
-    readout_control_qube = [
-        {
-            _name_tag: "readout_01",
-            _type_tag: _readout_val,
-            "ch_dac": [15],  # awg id
-            "ch_adc": 1,  # module id
-            "cnco_dac": (0, 0),  # chip, main path
-            "cnco_adc": (0, 3),  # chip, main path
-            "fnco_dac": [(0, 0)],  # chip, link id
-            "lo_dac": 0,  # local oscillator id
-            mixer_tag: 0,  # mixer channel
-            usb_lsb_tag: usb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0003,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "pump_2",
-            _type_tag: _control_val,
-            "ch_dac": [14],  # awg id
-            "cnco_dac": (0, 1),  # chip, main path id
-            "fnco_dac": [(0, 1)],  # chip, link no
-            "lo_dac": 1,  # local oscillator id
-            mixer_tag: 1,  # mixer channel
-            usb_lsb_tag: usb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0004,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_5",
-            _type_tag: _control_val,
-            "ch_dac": [11, 12, 13],  # awg id
-            "cnco_dac": (0, 2),  # chip, main path id
-            "fnco_dac": [(0, 4), (0, 3), (0, 2)],  # chip, link no
-            "lo_dac": 2,  # local oscillator id
-            mixer_tag: 2,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0020,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_6",
-            _type_tag: _control_val,
-            "ch_dac": [8, 9, 10],  # awg id
-            "cnco_dac": (0, 3),  # chip, main path id
-            "fnco_dac": [(0, 5), (0, 6), (0, 7)],  # chip, link no
-            "lo_dac": 3,  # local oscillator id
-            mixer_tag: 3,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0040,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_7",
-            _type_tag: _control_val,
-            "ch_dac": [5, 6, 7],  # awg id
-            "cnco_dac": (1, 0),  # chip, main path id
-            "fnco_dac": [(1, 2), (1, 1), (1, 0)],  # chip, link no
-            "lo_dac": 4,  # local oscillator id
-            mixer_tag: 4,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0080,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "control_8",
-            _type_tag: _control_val,
-            "ch_dac": [0, 3, 4],  # awg id
-            "cnco_dac": (1, 1),  # chip, main path id
-            "fnco_dac": [(1, 5), (1, 4), (1, 3)],  # chip, link no
-            "lo_dac": 5,  # local oscillator id
-            mixer_tag: 5,  # mixer channel
-            usb_lsb_tag: lsb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0100,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "pump_b",
-            _type_tag: _control_val,
-            "ch_dac": [1],  # awg id
-            "cnco_dac": (1, 2),  # chip, main path id
-            "fnco_dac": [(1, 6)],  # chip, link no
-            "lo_dac": 6,  # local oscillator id
-            mixer_tag: 6,  # mixer channel
-            usb_lsb_tag: usb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x0800,  # switch mask bit(s)
-        },
-        {
-            _name_tag: "readout_cd",
-            _type_tag: _readout_val,
-            "ch_dac": [2],  # awg id
-            "ch_adc": 0,  # module id
-            "cnco_dac": (1, 3),  # chip, main path
-            "cnco_adc": (1, 3),  # chip, main path
-            "fnco_dac": [(1, 7)],  # chip, link no
-            "lo_dac": 7,  # local oscillator id
-            mixer_tag: 7,  # mixer channel
-            usb_lsb_tag: usb_val,  # mixder sideband (initial value)
-            gpiosw_tag: 0x3000,  # switch mask bit(s)
-        },
-    ]
-
-    servers = {
-        "qube001": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.19",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.19",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.19",
-            QSConstants.SRV_QUBETY_TAG: "A",
-            QSConstants.SRV_CHANNEL_TAG: readout_control_qube,
-        },
-        "qube002": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.6",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.6",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.6",
-            QSConstants.SRV_QUBETY_TAG: "A",
-            QSConstants.SRV_CHANNEL_TAG: readout_control_qube,
-        },
-        "qube003": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.21",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.21",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.21",
-            QSConstants.SRV_QUBETY_TAG: "B",
-            QSConstants.SRV_CHANNEL_TAG: control_qube_500_1500,
-        },
-        "qube004": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.22",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.22",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.22",
-            QSConstants.SRV_QUBETY_TAG: "A",
-            QSConstants.SRV_CHANNEL_TAG: readout_control_qube,
-        },
-        "qube005": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.23",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.23",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.23",
-            QSConstants.SRV_QUBETY_TAG: "A",
-            QSConstants.SRV_CHANNEL_TAG: readout_control_qube,
-        },
-        "qube006": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.24",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.24",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.24",
-            QSConstants.SRV_QUBETY_TAG: "B",
-            QSConstants.SRV_CHANNEL_TAG: control_qube_500_1500,
-        },
-        "qube007": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.1",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.1",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.1",
-            QSConstants.SRV_QUBETY_TAG: "A",
-            QSConstants.SRV_CHANNEL_TAG: readout_control_qube,
-        },
-        "qube008": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.9",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.9",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.9",
-            QSConstants.SRV_QUBETY_TAG: "A",
-            QSConstants.SRV_CHANNEL_TAG: readout_control_qube,
-        },
-        "qube009": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.27",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.27",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.27",
-            QSConstants.SRV_QUBETY_TAG: "B",
-            QSConstants.SRV_CHANNEL_TAG: control_qube_500_1500,
-        },
-        "qube010": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.15",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.15",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.15",
-            QSConstants.SRV_QUBETY_TAG: "A",
-            QSConstants.SRV_CHANNEL_TAG: readout_control_qube,
-        },
-        "qube011": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.29",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.29",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.29",
-            QSConstants.SRV_QUBETY_TAG: "A",
-            QSConstants.SRV_CHANNEL_TAG: readout_control_qube,
-        },
-        "qube012": {
-            QSConstants.SRV_IPFPGA_TAG: "10.1.0.30",
-            QSConstants.SRV_IPLSI_TAG: "10.5.0.30",
-            QSConstants.SRV_IPCLK_TAG: "10.2.0.30",
-            QSConstants.SRV_QUBETY_TAG: "B",
-            QSConstants.SRV_CHANNEL_TAG: control_qube_500_1500,
-        },
-    }
-    return json.dumps(servers)
-
-
-def load_config(cxn, config):
-    reg = cxn[QSConstants.REGSRV]
+SNAP_META = "__meta__"  # the array holding the JSON metadata
+SNAP_ARRAY = "__array__"  # the key that refers to an array in the metadata
+
+
+def save_snapshot(path, version, snapshot):
+    """
+    Write a session snapshot to a numpy .npz file without pickled objects.
+
+    The numpy arrays in [snapshot] are stored as arrays of the file. The rest of
+    it is stored as JSON metadata in which an array is referred by its name.
+    """
+    arrays = dict()
+
+    def encode(value):
+        if isinstance(value, np.ndarray):
+            name = "a{}".format(len(arrays))
+            arrays[name] = value
+            return {SNAP_ARRAY: name}
+        elif isinstance(value, dict):
+            return {str(_k): encode(_v) for _k, _v in value.items()}
+        elif isinstance(value, (list, tuple)):
+            return [encode(_v) for _v in value]
+        elif isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    meta = json.dumps({"version": version, "snapshot": encode(snapshot)})
+    with open(path, "wb") as f:
+        np.savez(f, **{SNAP_META: np.array(meta)}, **arrays)
+
+
+def load_snapshot(path):
+    """
+    Read a session snapshot written by save_snapshot().
+
+    The file is loaded with allow_pickle=False, so that it never runs code.
+
+    Returns:
+        (version, snapshot) : (None, None) if [path] is not a session snapshot.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {_k: npz[_k] for _k in npz.files}
+        meta = json.loads(str(arrays.pop(SNAP_META)))
+    except (zipfile.BadZipFile, ValueError, KeyError, TypeError, AttributeError):
+        return None, None
+
+    def decode(value):
+        if isinstance(value, dict):
+            if [SNAP_ARRAY] == list(value.keys()):
+                return arrays[value[SNAP_ARRAY]]
+            return {_k: decode(_v) for _k, _v in value.items()}
+        elif isinstance(value, list):
+            return [decode(_v) for _v in value]
+        return value
+
     try:
-        reg.cd(QSConstants.REGDIR)
-        if isinstance(config, str):
-            reg.set(QSConstants.REGLNK, config)
-        else:
-            raise TypeError(config)
-    except Exception as e:
-        print(sys._getframe().f_code.co_name, e)
-
-
-def load_skew_zero(cxn):
-    reg = cxn[QSConstants.REGSRV]
-    zero = 0  # The zero skew time difference.
-    try:  # We specify the skew value with
-        reg.cd(QSConstants.REGDIR)  # the number of clocks (8 ns).
-        config = json.loads(reg.get(QSConstants.REGLNK))
-        chassis = config.keys()
-        skew = {}
-        for chassis_name in chassis:
-            skew.update({chassis_name: zero})
-        reg.set(QSConstants.REGSKEW, json.dumps(skew))
-    except Exception as e:
-        print(sys._getframe().f_code.co_name, e)
+        return meta["version"], decode(meta["snapshot"])
+    except (TypeError, KeyError):
+        return None, None
+
+
+############################################################
+#
+# BULK REGISTER ACCESS
+#
+class RegisterBulkAccess:
+    """
+    Bit-field accesses of e7awgsw registers in as few transactions as possible.
+
+    A field is (addr, offset, pos, bits) for a read and (addr, offset, pos, bits,
+    data) for a write. The 32-bit registers at consecutive offsets of the same
+    address are coalesced into one range access with multi_read() and
+    multi_write() of the register access object.
+    """
+
+    REG_BYTES = 4  # 32-bit registers
+    REG_MASK = 0xFFFFFFFF
+
+    def __init__(self, reg_access):
+        self._reg = reg_access
+
+    def read_range(self, addr, offset, num_regs):
+        return list(self._reg.multi_read(addr, offset, num_regs))
+
+    def write_range(self, addr, offset, values):
+        self._reg.multi_write(addr, offset, *values)
+
+    @classmethod
+    def coalesce(cls, registers):
+        """
+        Args:
+            registers : iterable of (addr, offset).
+        Returns:
+            runs      : list of (addr, offset, num_regs) of consecutive registers.
+        """
+        runs = list()
+        for addr, offset in sorted(set(registers)):
+            if runs:
+                _a, _o, _n = runs[-1]
+                if _a == addr and _o + cls.REG_BYTES * _n == offset:
+                    runs[-1] = (_a, _o, _n + 1)
+                    continue
+            runs.append((addr, offset, 1))
+        return runs
+
+    def read_registers(self, registers):
+        """Returns the dict of (addr, offset) to the register value."""
+        values = dict()
+        for addr, offset, num_regs in self.coalesce(registers):
+            for _i, _v in enumerate(self.read_range(addr, offset, num_regs)):
+                values[(addr, offset + self.REG_BYTES * _i)] = _v
+        return values
+
+    @staticmethod
+    def register_map(regs_class, addrs=None):
+        """
+        (addr, offset) of the registers listed in an e7awgsw.memorymap class.
+
+        Args:
+            regs_class : a class with ADDR and Offset, e.g. CaptureMasterCtrlRegs.
+            addrs      : base addresses to use instead of regs_class.ADDR.
+        """
+        offsets = sorted(
+            {
+                _v
+                for _k, _v in vars(regs_class.Offset).items()
+                if not _k.startswith("_") and isinstance(_v, int)
+            }
+        )
+        if addrs is None:
+            addrs = [regs_class.ADDR]
+        return [(_a, _o) for _a in addrs for _o in offsets]
+
+    def snapshot(self, registers):
+        """
+        Returns:
+            dump : np.ndarray of (addr, offset, value) rows in the order of
+                   registers, suitable for diffing two dumps.
+        """
+        values = self.read_registers(registers)
+        return np.array(
+            [(_a, _o, values[(_a, _o)]) for _a, _o in registers], dtype=np.uint32
+        ).reshape(-1, 3)
+
+    def read_fields(self, fields):
+        """Returns the values of the fields (addr, offset, pos, bits) in order."""
+        values = self.read_registers([(_f[0], _f[1]) for _f in fields])
+        return [
+            (values[(addr, offset)] >> pos) & ((1 << bits) - 1)
+            for addr, offset, pos, bits in fields
+        ]
+
+    def write_fields(self, fields):
+        """
+        Write the fields (addr, offset, pos, bits, data) by read-modify-write.
+
+        The fields are split into batches at the first field of a register
+        already in the batch, so that repeated writes to a register, e.g. a
+        pulse of a control bit, reach the hardware in order.
+        """
+        batches = [[]]
+        for field in fields:
+            if (field[0], field[1]) in [(_f[0], _f[1]) for _f in batches[-1]]:
+                batches.append([])
+            batches[-1].append(field)
 
+        for batch in batches:
+            partial = [
+                (_f[0], _f[1]) for _f in batch if not (0 == _f[2] and 32 <= _f[3])
+            ]
+            values = self.read_registers(partial)
+            for addr, offset, pos, bits, data in batch:
+                mask = ((1 << bits) - 1) << pos
+                current = values.get((addr, offset), 0)
+                values[(addr, offset)] = (
+                    current & ~mask | (data << pos) & mask
+                ) & self.REG_MASK
+            for addr, offset, num_regs in self.coalesce(values):
+                self.write_range(
+                    addr,
+                    offset,
+                    [
+                        values[(addr, offset + self.REG_BYTES * _i)]
+                        for _i in range(num_regs)
+                    ],
+                )
@@ -0,0 +1,80 @@
+"""
+Import time of QubeServer and the server entry point.
+
+Each statement runs in a fresh interpreter and the median wall time is shown,
+together with the heavy libraries it loaded. With --legacy-rev, the monolithic
+QubeServer.py of the git revision is measured as well.
+
+    $ python sandbox/bench_import_time.py [--repeat 5] [--legacy-rev e9fe2ba]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HEAVY = ["labrad", "twisted", "e7awgsw", "quel_ic_config", "quel_clock_master", "qubelsi"]
+
+PROBE = """
+import sys, time
+sys.path.insert(0, {path!r})
+_t = time.perf_counter()
+{statement}
+_t = time.perf_counter() - _t
+print(_t, ",".join(_m for _m in {heavy!r} if _m in sys.modules))
+"""
+
+SCENARIOS = [
+    ("import QubeServer", ROOT, "import QubeServer"),
+    ("basic_config()", ROOT, "import QubeServer; QubeServer.basic_config()"),
+    ("import app", os.path.join(ROOT, "qubesrv"), "import app"),
+    (
+        "create_server()",
+        os.path.join(ROOT, "qubesrv"),
+        "import app; app.create_server('QuBE Server')",
+    ),
+]
+
+
+def measure(path, statement, repeat):
+    code = PROBE.format(path=path, statement=statement, heavy=HEAVY)
+    times, loaded = [], ""
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, cwd=path
+        )
+        if 0 != proc.returncode:
+            return None, proc.stderr.strip().splitlines()[-1]
+        elapsed, _, loaded = proc.stdout.strip().partition(" ")
+        times.append(float(elapsed))
+    return statistics.median(times), loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--legacy-rev", type=str, default=None)
+    args = parser.parse_args()
+
+    scenarios = list(SCENARIOS)
+    if args.legacy_rev is not None:
+        legacy = tempfile.mkdtemp()
+        with open(os.path.join(legacy, "QubeServer.py"), "wb") as f:
+            f.write(
+                subprocess.check_output(
+                    ["git", "show", f"{args.legacy_rev}:QubeServer.py"], cwd=ROOT
+                )
+            )
+        scenarios += [
+            ("legacy import", legacy, "import QubeServer"),
+            ("legacy basic_config()", legacy, "import QubeServer; QubeServer.basic_config()"),
+        ]
+
+    for name, path, statement in scenarios:
+        elapsed, detail = measure(path, statement, args.repeat)
+        if elapsed is None:
+            print("{:24s}: unavailable ({})".format(name, detail))
+        else:
+            print("{:24s}: {:8.1f} ms  loaded [{}]".format(name, 1e3 * elapsed, detail))
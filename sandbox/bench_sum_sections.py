@@ -0,0 +1,65 @@
+"""
+Time to compile acquisition windows into sum sections.
+
+Compares the former list.pop(0) loop of build_capture_param() with
+dsp.compile_sum_sections().
+
+    $ python sandbox/bench_sum_sections.py
+"""
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "qubesrv"))
+
+from constants import QSConstants  # noqa: E402
+import dsp  # noqa: E402
+
+
+def legacy(windows, repetition_time):
+    resol = QSConstants.ACQ_CAPW_RESOL
+    win_word = list()
+    for _s, _e in windows:
+        win_word.append(int((_s + resol / 2) // resol))
+        win_word.append(int((_e + resol / 2) // resol))
+    win_word.append(int((repetition_time + resol // 2) // resol))
+
+    sections = list()
+    _s0 = win_word.pop(0)
+    win_word[-1] += _s0
+    while len(win_word) > 1:
+        _e = win_word.pop(0)
+        _s = win_word.pop(0)
+        sections.append((_e - _s0, _s - _e))
+        _s0 = _s
+    return sections
+
+
+def vectorized(windows, repetition_time):
+    _, section_lengths, blank_lengths = dsp.compile_sum_sections(
+        windows, repetition_time
+    )
+    return list(zip(section_lengths.tolist(), blank_lengths.tolist()))
+
+
+if __name__ == "__main__":
+    for n in [8, 256, 4096]:
+        starts = QSConstants.ACQ_CAST_RESOL + 256 * np.arange(n)
+        windows = np.stack([starts, starts + 128], axis=1)
+        repetition_time = int(starts[-1]) + 1024
+        pairs = [tuple(_w) for _w in windows.tolist()]
+
+        assert legacy(pairs, repetition_time) == vectorized(windows, repetition_time)
+        number = max(1, 20000 // n)
+        for name, func, arg in [
+            ("legacy", legacy, pairs),
+            ("vectorized", vectorized, windows),
+        ]:
+            elapsed = timeit.timeit(lambda: func(arg, repetition_time), number=number)
+            print(
+                "{:5d} sections {:10s}: {:10.1f} us".format(
+                    n, name, 1e6 * elapsed / number
+                )
+            )
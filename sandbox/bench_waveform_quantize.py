@@ -0,0 +1,63 @@
+"""
+Peak memory and time of waveform validation and quantization.
+
+Compares the former path of upload_waveform(); astype(complex), np.abs() and
+static_DACify(), with dsp.quantize_waveforms().
+
+    $ python sandbox/bench_waveform_quantize.py [samples] [channels]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "qubesrv"))
+
+from constants import QSConstants  # noqa: E402
+import dsp  # noqa: E402
+
+
+def legacy(wavedata):
+    waveforms = np.atleast_2d(wavedata).astype(complex)
+    if not np.max(np.abs(waveforms)) < 1.0:
+        return None
+    return [
+        list(
+            zip(
+                (np.real(_w) * QSConstants.DAC_BITS_POW_HALF).astype(int),
+                (np.imag(_w) * QSConstants.DAC_BITS_POW_HALF).astype(int),
+            )
+        )
+        for _w in waveforms
+    ]
+
+
+def chunked(wavedata):
+    waveforms = np.atleast_2d(np.asarray(wavedata, dtype=complex))
+    return dsp.quantize_waveforms(waveforms)
+
+
+def measure(func, wavedata):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(wavedata)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    samples = int(sys.argv[1]) if 1 < len(sys.argv) else 1 << 20
+    chans = int(sys.argv[2]) if 2 < len(sys.argv) else 1
+
+    rng = np.random.default_rng(0)
+    wavedata = 0.5 * (
+        rng.random((chans, samples)) - 0.5 + 1j * (rng.random((chans, samples)) - 0.5)
+    )
+    print("input   : {:10.1f} MB".format(wavedata.nbytes / 2**20))
+    for name, func in [("legacy", legacy), ("chunked", chunked)]:
+        elapsed, peak = measure(func, wavedata)
+        print("{:8s}: {:10.1f} MB peak, {:8.3f} s".format(name, peak / 2**20, elapsed))
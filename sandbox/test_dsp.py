@@ -0,0 +1,246 @@
+"""
+Tests of the numerical kernels in qubesrv/dsp.py. Only numpy is required.
+
+    $ python -m pytest sandbox/test_dsp.py
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "qubesrv"))
+
+import dsp
+from constants import QSConstants
+
+
+def _legacy_quantize(waveforms):
+    """check_waveform() and static_DACify() before the chunked kernel."""
+    if not np.max(np.abs(waveforms)) < 1.0:
+        return None
+    return np.array(
+        [
+            list(
+                zip(
+                    (np.real(_w) * QSConstants.DAC_BITS_POW_HALF).astype(int),
+                    (np.imag(_w) * QSConstants.DAC_BITS_POW_HALF).astype(int),
+                )
+            )
+            for _w in waveforms
+        ]
+    )
+
+
+def _random_waveforms(chans, length, seed=0):
+    rng = np.random.default_rng(seed)
+    amplitude = rng.uniform(0, 1, (chans, length)) * (1 - 1e-12)
+    return amplitude * np.exp(2j * np.pi * rng.uniform(0, 1, (chans, length)))
+
+
+@pytest.mark.parametrize("length, chunk", [(1000, 4096), (1000, 64), (1000, 7), (1, 1)])
+def test_quantize_waveforms_matches_legacy(length, chunk):
+    waveforms = _random_waveforms(3, length)
+    waveforms[0, 0] = -(1 - 1e-9)  # the extremes of the int16 range
+    waveforms[1, -1] = 1j * (1 - 1e-9)
+    iq = dsp.quantize_waveforms(waveforms, chunk=chunk)
+
+    assert np.int16 == iq.dtype and (3, length, 2) == iq.shape
+    np.testing.assert_array_equal(iq, _legacy_quantize(waveforms))
+
+    out = np.zeros((3, length, 2), dtype=np.int16)
+    assert dsp.quantize_waveforms(waveforms, chunk=chunk, out=out) is out
+    np.testing.assert_array_equal(out, iq)
+
+
+@pytest.mark.parametrize("index", [0, 15, 16, 17, 31, 32, 39])
+@pytest.mark.parametrize("value", [1.0, -1.0, 1j, (1 + 1j) / np.sqrt(2), 2.5])
+def test_quantize_waveforms_rejects_full_scale_at_chunk_boundaries(index, value):
+    waveforms = _random_waveforms(2, 40)  # chunks of 16, 16 and 8 samples
+    waveforms[1, index] = value
+    assert _legacy_quantize(waveforms) is None
+    assert dsp.quantize_waveforms(waveforms, chunk=16) is None
+
+
+def test_quantize_waveforms_agrees_with_abs_near_full_scale():
+    phases = np.linspace(0, 2 * np.pi, 257)
+    for ulps in range(-8, 3):
+        waveforms = (1 + ulps * 2**-53) * np.exp(1j * phases)[:, np.newaxis]
+        for waveform in waveforms:
+            expected = _legacy_quantize(waveform[np.newaxis, :]) is None
+            assert expected == (dsp.quantize_waveforms(waveform[np.newaxis, :]) is None)
+
+
+def _legacy_sum_sections(windows, repetition_time):
+    """The loop of build_capture_param() before compile_sum_sections()."""
+    resol = QSConstants.ACQ_CAPW_RESOL
+    win_word = list()
+    for _s, _e in windows:
+        win_word.append(int((_s + resol / 2) // resol))
+        win_word.append(int((_e + resol / 2) // resol))
+    win_word.append(int((repetition_time + resol // 2) // resol))
+
+    _s0 = win_word.pop(0)
+    capture_delay = _s0
+    win_word[-1] += _s0  # the repetition is offset by the capture delay
+    sections = list()
+    while len(win_word) > 1:
+        _e = win_word.pop(0)
+        _s = win_word.pop(0)
+        sections.append((_e - _s0, _s - _e))
+        _s0 = _s
+    return capture_delay, sections
+
+
+@pytest.mark.parametrize(
+    "windows, repetition_time",
+    [
+        ([(512, 1536)], 10240),
+        ([(0, 64)], 10240),
+        ([(130, 258), (1000, 3002), (5000, 5100)], 30720),
+        ([(_s, _s + 128) for _s in range(1024, 1024 + 256 * 4096, 256)], 1064960),
+    ],
+)
+def test_compile_sum_sections_matches_legacy(windows, repetition_time):
+    capture_delay, section_lengths, blank_lengths = dsp.compile_sum_sections(
+        np.array(windows), repetition_time
+    )
+    legacy_delay, legacy_sections = _legacy_sum_sections(windows, repetition_time)
+
+    assert legacy_delay == capture_delay
+    assert legacy_sections == list(
+        zip(section_lengths.tolist(), blank_lengths.tolist())
+    )
+    # the last blank wraps to the first window of the next repetition
+    resol = QSConstants.ACQ_CAPW_RESOL
+    assert (repetition_time + resol // 2) // resol == (
+        section_lengths.sum() + blank_lengths.sum()
+    )
+
+
+def test_compile_sum_sections_limits():
+    resol = QSConstants.ACQ_CAPW_RESOL
+    windows = np.array([(4 * resol, 8 * resol), (12 * resol, 14 * resol)])
+    repetition_time = 40 * resol
+    # capture delay 4, sections (4, 4) and (2, 30), 2 sections
+    exact = (2, 4, 30, 4)
+    assert dsp.compile_sum_sections(windows, repetition_time, exact) is not None
+
+    for index in range(len(exact)):
+        limits = list(exact)
+        limits[index] -= 1
+        assert dsp.compile_sum_sections(windows, repetition_time, limits) is None
+
+    empty_section = np.array([(4 * resol, 4 * resol)])
+    assert dsp.compile_sum_sections(empty_section, repetition_time, exact) is None
+    no_blank = np.array([(4 * resol, 8 * resol), (8 * resol, 14 * resol)])
+    assert dsp.compile_sum_sections(no_blank, repetition_time, exact) is None
+
+
+def _carrier(sign, interval, frequency, length):
+    return np.exp(sign * 2j * np.pi * frequency * 1e-3 * interval * np.arange(length))
+
+
+@pytest.mark.parametrize(
+    "target, kind, params",
+    [
+        ("fir", "gaussian", (8.0,)),
+        ("fir", "kaiser", (4.0,)),
+        ("window", "raised_cosine", (0.5,)),
+        ("window", "kaiser", (6.0,)),
+    ],
+)
+def test_design_matches_quantize_coefficients(target, kind, params):
+    interval, max_length, full_scale, sign = dsp._coefficient_format(target)
+    length, frequency = max_length, 12.5
+    coeffs = dsp.design_coefficients(target, kind, frequency, length, params)
+
+    assert coeffs is not None and length == len(coeffs)
+    assert not coeffs.flags.writeable
+    assert np.all(np.real(coeffs) == np.round(np.real(coeffs)))
+    assert np.all(np.imag(coeffs) == np.round(np.imag(coeffs)))
+
+    # the peak is scaled to 1 - 1e-3 of the full scale before the truncation
+    peak = np.max(np.abs(coeffs))
+    assert peak <= (1 - 1e-3) * full_scale
+    assert (1 - 1e-3) * full_scale - np.sqrt(2) <= peak
+
+    if "kaiser" == kind:
+        envelope = np.kaiser(length, params[0])
+        expected = envelope * _carrier(sign, interval, frequency, length)
+        expected = dsp.quantize_coefficients(
+            expected * ((1 - 1e-3) / np.max(np.abs(expected))), full_scale
+        )
+        np.testing.assert_array_equal(coeffs, expected)
+
+
+def test_design_is_cached_and_validated():
+    first = dsp.design_coefficients("window", "gaussian", 5.0, 64, (20.0,))
+    assert first is dsp.design_coefficients("window", "gaussian", 5.0, 64, (20.0,))
+
+    assert dsp.design_coefficients("window", "unknown", 5.0, 64, (20.0,)) is None
+    assert dsp.design_coefficients("fir", "kaiser", 0.0, 0, (4.0,)) is None
+    too_long = QSConstants.ACQ_MAX_FCOEF + 1
+    assert dsp.design_coefficients("fir", "kaiser", 0.0, too_long, (4.0,)) is None
+    assert dsp.design_coefficients("fir", "matched", 0.0, 8, (1.0,) * 4) is None
+
+
+def test_matched_design_conjugates_reference_trace():
+    trace = tuple(np.exp(0.3j * np.arange(32)) * np.hanning(32))
+    coeffs = dsp.design_coefficients("window", "matched", 0.0, 32, trace)
+    expected = np.conj(np.asarray(trace))
+    expected = dsp.quantize_coefficients(
+        expected * ((1 - 1e-3) / np.max(np.abs(expected))),
+        QSConstants.ACQ_WCBIT_POW_HALF,
+    )
+    np.testing.assert_array_equal(coeffs, expected)
+
+
+def _calibration_traces(correlation, captures=2000, samples=32, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(samples)
+    mean0 = np.zeros(samples, dtype=complex)
+    mean1 = 0.2 * np.exp(0.2j * t) * np.exp(-t / samples)
+
+    def noise():
+        white = rng.standard_normal((captures, samples)) + 1j * rng.standard_normal(
+            (captures, samples)
+        )
+        colored = np.copy(white)
+        for n in range(1, samples):  # first order autoregressive noise
+            colored[:, n] = correlation * colored[:, n - 1] + white[:, n]
+        return colored
+
+    return mean0 + noise(), mean1 + noise()
+
+
+def test_matched_window_is_quantized():
+    traces0, traces1 = _calibration_traces(0.0)
+    coeffs, gain = dsp.matched_window(traces0, traces1)
+    full_scale = QSConstants.ACQ_WCBIT_POW_HALF
+
+    assert len(coeffs) == traces0.shape[1]
+    np.testing.assert_array_equal(
+        coeffs, dsp.quantize_coefficients(coeffs / full_scale, full_scale)
+    )
+    assert np.max(np.abs(coeffs)) <= (1 - 1e-3) * full_scale
+    assert 1.0 <= gain
+
+
+def test_whitening_gains_on_correlated_noise():
+    traces0, traces1 = _calibration_traces(0.9)
+    plain, plain_gain = dsp.matched_window(traces0, traces1)
+    whitened, whitened_gain = dsp.matched_window(traces0, traces1, whiten=True)
+
+    assert 1.0 <= whitened_gain
+    assert plain_gain <= whitened_gain
+
+    # the gain is relative to the reference coefficients
+    _, relative = dsp.matched_window(traces0, traces1, whiten=True, reference=plain)
+    assert 1.0 <= relative
+
+
+def test_matched_window_without_separation():
+    traces0, _ = _calibration_traces(0.0)
+    coeffs, gain = dsp.matched_window(traces0, traces0)
+    assert coeffs is None and 0.0 == gain
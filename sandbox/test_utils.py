@@ -0,0 +1,51 @@
+"""
+Tests of the host-side helpers in qubesrv/utils.py. Only numpy is required.
+
+    $ python -m pytest sandbox/test_utils.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "qubesrv"))
+
+from constants import QSConstants
+from utils import SequencerLatencyMonitor
+
+
+def _monitor(read, add, chassis_list):
+    monitor = SequencerLatencyMonitor()
+    monitor.record(chassis_list[0], SequencerLatencyMonitor.READ, read)
+    for chassis_name in chassis_list:
+        monitor.record(chassis_name, SequencerLatencyMonitor.ADD, add)
+    return monitor
+
+
+def test_safe_delay_is_none_until_measured():
+    monitor = _monitor(0.002, 0.001, ["qube001"])
+    assert monitor.safe_delay("qube001", ["qube001", "qube002"], 3.0) is None
+
+
+def test_safe_delay_covers_a_start():
+    chassis_list = ["qube001", "qube002", "qube003"]
+    monitor = _monitor(0.002, 0.001, chassis_list)
+    assert monitor.safe_delay("qube001", chassis_list, 3.0) == pytest.approx(
+        3.0 * (0.002 + 3 * 0.001)
+    )
+
+
+def test_safe_delay_covers_every_entry_of_a_train():
+    chassis_list = ["qube001", "qube002", "qube003"]
+    monitor = _monitor(0.002, 0.001, chassis_list)
+    count = QSConstants.DAQ_TRAIN_MAX
+    delay = monitor.safe_delay("qube001", chassis_list, 3.0, count)
+
+    # the adds of all the entries are issued after the clock is read
+    assert delay == pytest.approx(3.0 * (0.002 + count * len(chassis_list) * 0.001))
+    assert monitor.safe_delay("qube001", chassis_list, 3.0) < delay
+
+
+def test_safe_delay_lower_bound():
+    monitor = _monitor(1e-6, 1e-6, ["qube001"])
+    assert QSConstants.DAQ_SDLY_MIN == monitor.safe_delay("qube001", ["qube001"], 3.0)